@@ -2,6 +2,7 @@
 import argparse, os, random
 import numpy as np
 import matplotlib.pyplot as plt
+import points_io
 
 
 def arg_parser():
@@ -71,27 +72,8 @@ def collect_file(root_dir, topic, similar=None):
     return file_lsts
 
 def get_col(file_name, header_name="response"):
-    "get column named header_name from file_name"
-
-    col_value = []
-
-    with open(file_name, 'r', encoding="utf-8") as fin:
-        for line in fin:
-            if '#' in line:
-                assert(header_name in line)
-                lst_line = line.split('#')
-                lst_line = [ele.strip() for ele in lst_line]
-                dim_header = len(lst_line) - 1
-                lst_header_col = [ele==header_name for ele in lst_line]
-                header_col = lst_header_col.index(True)
-                continue
-            else:
-                lst_line = line.split()
-                lst_line = [ele.strip() for ele in lst_line]
-                dim_nonHeader = len(lst_line) - 1
-                assert(dim_header == dim_nonHeader)   # ensure all lines have same dim
-                lst_line = [float(pnt) for pnt in lst_line]
-                col_value.append(lst_line[header_col])         
+    "get column named header_name from file_name (TSV or binary point file)"
+    col_value = points_io.get_col(file_name, header_name)
 
     return col_value
 
@@ -176,10 +176,8 @@ def show_reject_effect_highMean(x_low, x_high, file_sample_task0, file_task1_stb
     GP1.get_data_from_file(file_sample_task0)
     GP1.theta = 0.7
 
-    y1_mean = [GP1.compute_mean([ele]) for ele in x_draw]
-    y1_conf_int = [GP1.conf_interval([ele]) for ele in x_draw]
-    y1_lower = [ele[0] for ele in y1_conf_int]
-    y1_upper = [ele[1] for ele in y1_conf_int]
+    y1_mean, _ = GP1.predict_batch(x_draw[:, None])
+    y1_lower, y1_upper = GP1.conf_interval_batch(x_draw[:, None])
 
     # Line 2: target function
     y_target = [tri_exp_mu([ele], lambda1, lambda2, lambda3, mu1, mu2, mu3, theta1, theta2, theta3) for ele in x_draw]
@@ -253,10 +251,8 @@ def show_reject_effect_lowMean(x_low, x_high, file_sample_task0, file_task1_stbo
     GP1.get_data_from_file(file_sample_task0)
     GP1.theta = 0.7
 
-    y1_mean = [GP1.compute_mean([ele]) for ele in x_draw]
-    y1_conf_int = [GP1.conf_interval([ele]) for ele in x_draw]
-    y1_lower = [ele[0] for ele in y1_conf_int]
-    y1_upper = [ele[1] for ele in y1_conf_int]
+    y1_mean, _ = GP1.predict_batch(x_draw[:, None])
+    y1_lower, y1_upper = GP1.conf_interval_batch(x_draw[:, None])
 
     # Line 2: target function
     y_target = [tri_exp_mu([ele], lambda1, lambda2, lambda3, mu1, mu2, mu3, theta1, theta2, theta3) for ele in x_draw]
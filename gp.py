@@ -1,12 +1,210 @@
 #!/usr/bin/env python3
 
-import os
+import os, json, hashlib, tempfile, shutil
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.stats import norm, qmc
+from scipy.linalg import cho_solve, solve_triangular
 from smt.sampling_methods import LHS
 import itertools
-from utils import write_exp_result, dist, find_max_min_of_each_component, check_inBounds, rkhs_norm
+from multiprocessing import shared_memory
+from points_io import read_points, write_table, default_columns
+from utils import write_exp_result, dist, find_max_min_of_each_component, check_inBounds, rkhs_norm, square_dist_mat
+
+
+def compute_cholesky(matrix, max_tries=10):
+    "lower Cholesky factor of matrix, add jitter 10^k*1e-8 to diagonal if matrix is singular"
+    try:
+        return np.linalg.cholesky(matrix), 0.0
+    except np.linalg.LinAlgError:
+        pass
+
+    for k in range(1, max_tries+1):
+        jitter = 10**k * 1e-8
+        try:
+            return np.linalg.cholesky(matrix + jitter*np.eye(len(matrix))), jitter
+        except np.linalg.LinAlgError:
+            continue
+
+    raise np.linalg.LinAlgError("kernel covariance matrix is not positive definite")
+
+
+def attach_shared_memory(shm_name):
+    "attach an existing shared memory block, the creating process stays responsible for unlinking it"
+    try:
+        shm = shared_memory.SharedMemory(name=shm_name, track=False)   # python >= 3.13
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=shm_name)                # workers share the resource tracker of the creator
+
+    return shm
+
+
+# version of fitted GP artifacts on disk, artifacts with another version are refitted
+ARTIFACT_VERSION = 1
+
+
+class FittedState:
+    """
+    Class FittedState: Cholesky factor of K and alpha = K^{-1}y for fixed (X, Y, theta)
+    """
+    shared_arrays = ("X", "Y", "chol", "alpha")
+
+    def __init__(self, lst_X, lst_Y, theta, kernel_type, kernel_Cov):
+        # keep the (X, Y) lists themselves to detect replaced or extended data
+        self.lst_X = lst_X
+        self.lst_Y = lst_Y
+        self.num_points = len(lst_X)
+        self.theta = theta
+        self.kernel_type = kernel_type
+
+        self.X = np.array(lst_X, dtype=float)
+        self.Y = np.array(lst_Y, dtype=float).reshape(-1, 1)
+        self.l_bound = self.X.min(axis=0)
+        self.u_bound = self.X.max(axis=0)
+
+        self.chol, self.jitter = compute_cholesky(kernel_Cov)
+        self.alpha = cho_solve((self.chol, True), self.Y)     # Woodbury vector K^{-1}y
+        self.sigma2_mle = (self.Y.T @ self.alpha)[0, 0] / self.num_points
+
+        self.shm = None          # shared memory block holding the arrays, see share()
+        self.shm_layout = None
+
+    def share(self):
+        "move arrays (X, Y, chol, alpha) to one shared memory block, pickled copies attach it instead of copying"
+        if self.shm != None:
+            return 0
+
+        arrays = [np.ascontiguousarray(getattr(self, name), dtype=float) for name in self.shared_arrays]
+        shm = shared_memory.SharedMemory(create=True, size=max(sum([arr.nbytes for arr in arrays]), 1))
+
+        layout = []
+        offset = 0
+        for name, arr in zip(self.shared_arrays, arrays):
+            shared_arr = np.ndarray(arr.shape, dtype=float, buffer=shm.buf, offset=offset)
+            shared_arr[...] = arr
+            setattr(self, name, shared_arr)
+            layout.append((name, offset, arr.shape))
+            offset += arr.nbytes
+
+        self.shm = shm
+        self.shm_layout = layout
+
+        return 0
+
+    def release(self):
+        "copy arrays back to private memory and free the shared memory block"
+        if self.shm == None:
+            return 0
+
+        for name in self.shared_arrays:
+            setattr(self, name, np.array(getattr(self, name)))
+
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+        self.shm_layout = None
+
+        return 0
+
+    def __getstate__(self):
+        "pickle without arrays in shared memory"
+        state = self.__dict__.copy()
+        if self.shm != None:
+            state["shm"] = self.shm.name
+            for name in self.shared_arrays:
+                del state[name]
+
+        return state
+
+    def __setstate__(self, state):
+        "attach arrays in shared memory when unpickled in a worker process"
+        self.__dict__.update(state)
+        if self.shm != None:
+            self.shm = attach_shared_memory(self.shm)
+            for name, offset, shape in self.shm_layout:
+                arr = np.ndarray(shape, dtype=float, buffer=self.shm.buf, offset=offset)
+                arr.flags.writeable = False
+                setattr(self, name, arr)
+
+    def save(self, artifact_dir, meta):
+        "write arrays as .npy files and meta (with jitter & sigma2_mle) as meta.json into artifact_dir"
+        os.makedirs(artifact_dir, exist_ok=True)
+        for name in self.shared_arrays:
+            np.save(os.path.join(artifact_dir, name + ".npy"), np.ascontiguousarray(getattr(self, name)))
+
+        meta = dict(meta, jitter=self.jitter, sigma2_mle=float(self.sigma2_mle))
+        with open(os.path.join(artifact_dir, "meta.json"), "w", encoding="utf-8") as f_out:
+            json.dump(meta, f_out, indent=2)
+
+        return 0
+
+    @classmethod
+    def load(cls, artifact_dir, lst_X, lst_Y, theta, kernel_type, meta, mmap=True):
+        "rebuild a FittedState of (lst_X, lst_Y) from artifact_dir without refactoring, arrays are memory mapped"
+        state = cls.__new__(cls)
+        state.lst_X = lst_X
+        state.lst_Y = lst_Y
+        state.num_points = len(lst_X)
+        state.theta = theta
+        state.kernel_type = kernel_type
+
+        mmap_mode = "r" if mmap else None
+        for name in cls.shared_arrays:
+            setattr(state, name, np.load(os.path.join(artifact_dir, name + ".npy"), mmap_mode=mmap_mode))
+
+        state.l_bound = state.X.min(axis=0)
+        state.u_bound = state.X.max(axis=0)
+        state.jitter = meta["jitter"]
+        state.sigma2_mle = meta["sigma2_mle"]
+
+        state.shm = None
+        state.shm_layout = None
+
+        return state
+
+    def is_valid(self, lst_X, lst_Y, theta, kernel_type):
+        "check whether the cached factor still matches (X, Y, theta)"
+        return (lst_X is self.lst_X) and (lst_Y is self.lst_Y) and (len(lst_X) == self.num_points) \
+            and (len(lst_Y) == self.num_points) and (theta == self.theta) and (kernel_type == self.kernel_type)
+
+    def append(self, current_point, response, kernel_Vec, kernel_self):
+        """
+        extend the factor by one row in O(n^2): K' = [[K, k], [k^T, k(x, x)]] => L' = [[L, 0], [l^T, d]]
+        return False if the extended matrix is not numerically positive definite
+        """
+        chol_row = self.half_solve(kernel_Vec)
+        chol_diag2 = kernel_self + self.jitter - np.sum(chol_row**2)
+        if chol_diag2 <= 0:
+            return False
+
+        # the extended arrays are private, a shared copy of the old ones would be stale for worker processes
+        self.release()
+
+        n = self.num_points
+        chol = np.zeros(shape=(n+1, n+1))
+        chol[:n, :n] = self.chol
+        chol[n, :n] = chol_row[:, 0]
+        chol[n, n] = np.sqrt(chol_diag2)
+        self.chol = chol
+
+        self.num_points = n + 1
+        self.X = np.vstack([self.X, np.reshape(np.array(current_point, dtype=float), (1, -1))])
+        self.Y = np.vstack([self.Y, [[float(response)]]])
+        self.l_bound = np.minimum(self.l_bound, self.X[n])
+        self.u_bound = np.maximum(self.u_bound, self.X[n])
+
+        self.alpha = cho_solve((self.chol, True), self.Y)
+        self.sigma2_mle = (self.Y.T @ self.alpha)[0, 0] / self.num_points
+
+        return True
+
+    def solve(self, mat):
+        "compute K^{-1} mat with the cached Cholesky factor"
+        return cho_solve((self.chol, True), mat)
+
+    def half_solve(self, mat):
+        "compute L^{-1} mat with K = L L^T"
+        return solve_triangular(self.chol, mat, lower=True)
 
 
 class ZeroGProcess:
@@ -23,34 +221,16 @@ class ZeroGProcess:
         self.theta = param_kernel
         self.prior_mean = prior_mean
         self.r_out_bound = r_out_bound      # mean ratio for out of boundary
+        self.fit_state = None               # cached Cholesky factor, rebuilt when X, Y or theta change
 
     def get_data_from_file(self, file_exp):
-        "get response vec and input from file_in"
-        res_col = 0  # default column number of response
-        num_points = 0
-
-        with open(file_exp, "r", encoding="utf-8") as f_in:
-            for line in f_in:
-                if '#' in line:  # with header line => get column of response
-                    lst_line = line.split('#')
-                    lst_line = [ele.strip() for ele in lst_line]
-                    dim_header = len(lst_line) - 1
-                    self.dim = dim_header
-                    lst_res_col = [ele=="response" for ele in lst_line]
-                    res_col = lst_res_col.index(True)
-                    continue
-                else:
-                    lst_line = line.split()
-                    lst_line = [ele.strip() for ele in lst_line]
-                    dim_nonHeader = len(lst_line) - 1
-                    assert(dim_header == dim_nonHeader)   # ensure all lines have same dim
+        "get response vec and input from file_in (TSV with header line, or binary point file)"
+        responses, points = read_points(file_exp)
 
-                    lst_line = [float(pnt) for pnt in lst_line]
-                    self.Y.append(lst_line[res_col])
-                    self.X.append(lst_line[:res_col] + lst_line[(res_col+1):])
-                    num_points += 1
-
-        self.num_points = num_points
+        self.dim = points.shape[1]
+        self.Y.extend(responses.tolist())
+        self.X.extend(points.tolist())
+        self.num_points = len(responses)
 
         # minus the prior mean if it is not None
         if self.prior_mean != None:
@@ -58,8 +238,85 @@ class ZeroGProcess:
 
         return 0
 
-    def kernel(self, x1, x2, theta=1.0):
-        "compute k(x1, x2) with Gaussian | Matern Kernel"
+    def artifact_key(self, file_exp, parent_key=""):
+        """
+        content hash of file_exp and the settings used in fitting (theta, kernel, prior_mean, sigma^2),
+        parent_key: key of the models the data depend on (e.g. lower layers of a stack of GPs)
+        """
+        settings = {"version": ARTIFACT_VERSION, "theta": float(self.theta), "kernel_type": self.kernel_type,
+                    "prior_mean": self.prior_mean, "sigma2": self.sigma2, "parent_key": parent_key}
+
+        hasher = hashlib.sha256()
+        with open(file_exp, "rb") as f_in:
+            for block in iter(lambda: f_in.read(1 << 20), b""):
+                hasher.update(block)
+        hasher.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+
+        return hasher.hexdigest()
+
+    def save_fit_state(self, artifact_dir):
+        "fit the GP (if needed) and persist data & cached factor into artifact_dir, written atomically"
+        state = self.get_fit_state()
+        meta = {"version": ARTIFACT_VERSION, "theta": float(self.theta), "kernel_type": self.kernel_type,
+                "prior_mean": self.prior_mean, "dim": self.dim, "num_points": self.num_points}
+
+        parent_dir = os.path.dirname(os.path.abspath(artifact_dir))
+        os.makedirs(parent_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=parent_dir)
+        try:
+            state.save(tmp_dir, meta)
+            os.replace(tmp_dir, artifact_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)    # saved by another process in the meantime
+            if not os.path.isdir(artifact_dir):
+                raise
+
+        return 0
+
+    def load_fit_state(self, artifact_dir, mmap=True):
+        """
+        load data & cached factor from artifact_dir written by save_fit_state
+        return: True if loaded, False if no artifact of current version exists
+        """
+        file_meta = os.path.join(artifact_dir, "meta.json")
+        if not os.path.isfile(file_meta):
+            return False
+
+        with open(file_meta, "r", encoding="utf-8") as f_in:
+            meta = json.load(f_in)
+        if meta.get("version") != ARTIFACT_VERSION:
+            return False
+
+        self.theta = meta["theta"]
+        self.kernel_type = meta["kernel_type"]
+        self.prior_mean = meta["prior_mean"]
+
+        self.X = np.load(os.path.join(artifact_dir, "X.npy")).tolist()
+        self.Y = np.load(os.path.join(artifact_dir, "Y.npy"))[:, 0].tolist()
+        self.dim = meta["dim"]
+        self.num_points = meta["num_points"]
+
+        self.fit_state = FittedState.load(artifact_dir, self.X, self.Y, self.theta, self.kernel_type, meta, mmap)
+
+        return True
+
+    def get_data_from_file_cached(self, file_exp, cache_dir=None):
+        """
+        get_data_from_file with persisted fit: load data & factor from cache_dir/<artifact_key> if it exists,
+        otherwise read file_exp, fit and save; set theta, prior_mean & sigma2 before calling
+        """
+        if cache_dir == None:
+            return self.get_data_from_file(file_exp)
+
+        artifact_dir = os.path.join(cache_dir, self.artifact_key(file_exp))
+        if not self.load_fit_state(artifact_dir):
+            self.get_data_from_file(file_exp)
+            self.save_fit_state(artifact_dir)
+
+        return 0
+
+    def check_data(self):
+        "ensure experiment data exist before computing any kernel"
         # do not allow to call any methods before get experiment data
         assert(len(self.X) == len(self.Y))
         assert(len(self.X) > 0)
@@ -69,6 +326,12 @@ class ZeroGProcess:
             self.dim = len(self.X[0])
             self.num_points = len(self.X)
 
+        return 0
+
+    def kernel(self, x1, x2, theta=1.0):
+        "compute k(x1, x2) with Gaussian | Matern Kernel"
+        self.check_data()
+
         # compute k(x1, x2)
         if self.kernel_type == "gaussian":
             x1_x2 = [ele1 - ele2 for ele1, ele2 in zip(x1, x2)]
@@ -84,110 +347,171 @@ class ZeroGProcess:
 
         if self.kernel_type == "gaussian":
             x1_x2 = [ele1 - ele2 for ele1, ele2 in zip(x1_grad_pos, x2)]
-            grad_kernel_x1 = [(-1 / theta**2)*ele* self.kernel(x1_grad_pos, x2) for ele in x1_x2]
+            grad_kernel_x1 = [(-1 / theta**2)*ele* self.kernel(x1_grad_pos, x2, theta) for ele in x1_x2]
         elif self.kernel_type == "matern":
             pass
 
         return grad_kernel_x1
 
+    def compute_kernel_cross(self, lst_points_a, lst_points_b, theta=1.0):
+        "compute cross kernel covariance matrix: K = (k(a_i, b_j)), matrix (n*m)"
+        self.check_data()
+
+        if self.kernel_type == "gaussian":
+            norm2_mat = square_dist_mat(lst_points_a, lst_points_b)
+            kernel_Cross = np.exp(- 1/(2*theta**2)*norm2_mat)
+        elif self.kernel_type == "matern":
+            pass
+
+        return kernel_Cross
+
     def compute_kernel_cov(self, lst_exp_points, theta=1.0):
         "compute kernel covariance matrix: K = (k(x_i, x_j))"
+        kernel_Cov = self.compute_kernel_cross(lst_exp_points, lst_exp_points, theta)
 
-        dim = len(lst_exp_points)
-        kernel_Cov = np.zeros(shape=(dim, dim))
-
-        for i in range(dim):
-            for j in range(dim):
-                x_i = lst_exp_points[i]
-                x_j = lst_exp_points[j]
-                kernel_Cov[i, j] = self.kernel(x_i, x_j, theta)
-        
         return kernel_Cov
 
     def compute_kernel_vec(self, lst_exp_points, current_point, theta=1.0):
         "compute kernel vector at current_point: k_x = (k(x, x_i)), column vector"
-        dim = len(lst_exp_points)
-        kernel_Vec = np.zeros(shape=(dim, 1))
+        kernel_Vec = self.compute_kernel_cross(lst_exp_points, [current_point], theta)
 
-        for i in range(dim):
-            x_i = lst_exp_points[i]
-            kernel_Vec[i, 0] = self.kernel(current_point, x_i, theta)
-     
         return kernel_Vec
 
     def compute_grad_kernel_vec(self, lst_exp_points, current_point, theta=1.0):
         "compute gradient of row kernel vector k_x^T = (k(x, x_i))^T, matrix (d*t)"
-        dim = len(lst_exp_points)
-        grad_kernel_vec = []
+        arr_points = np.asarray(lst_exp_points, dtype=float)
+        arr_current = np.asarray(current_point, dtype=float)
+        kernel_Vec = self.compute_kernel_cross(arr_points, [arr_current], theta)[:, 0]
 
-        for i in range(dim):
-            x_i = lst_exp_points[i]
-            grad_kernel_xi = self.kernel_grad(current_point, x_i, theta)
-            grad_kernel_vec.append(grad_kernel_xi)
-        
-        grad_kernel_vec = np.transpose(np.matrix(grad_kernel_vec))
+        if self.kernel_type == "gaussian":
+            grad_kernel_vec = (-1 / theta**2) * np.transpose(arr_current - arr_points) * kernel_Vec
+        elif self.kernel_type == "matern":
+            pass
 
-        return grad_kernel_vec
+        return np.matrix(grad_kernel_vec)
+
+    def compute_grad_kernel_batch(self, arr_exp_points, arr_points, weights, theta=1.0):
+        """
+        compute sum_i w_ij * grad k(x_j, x_i) at every x_j for all rows x_j of arr_points, matrix (m*d)
+        weights: matrix (t*m) of w_ij, e.g. alpha_i * k(x_j, x_i)
+        """
+        if self.kernel_type == "gaussian":
+            grad_batch = (-1 / theta**2) * (arr_points * np.sum(weights, axis=0)[:, None] - weights.T @ arr_exp_points)
+        elif self.kernel_type == "matern":
+            pass
+
+        return grad_batch
+
+    def get_fit_state(self):
+        "return the cached FittedState, factor K again only if X, Y or theta changed"
+        state = self.fit_state
+        if (state == None) or (not state.is_valid(self.X, self.Y, self.theta, self.kernel_type)):
+            kernel_Cov_mat = self.compute_kernel_cov(self.X, self.theta)
+            state = FittedState(self.X, self.Y, self.theta, self.kernel_type, kernel_Cov_mat)
+            self.fit_state = state
+
+        return state
+
+    def list_gps(self):
+        "return this GP and all ZeroGProcess models used inside (e.g. zeroGP1 & diffGP)"
+        lst_gps = [self]
+        for value in vars(self).values():
+            lst_values = value if isinstance(value, list) else [value]
+            for sub_value in lst_values:
+                if isinstance(sub_value, ZeroGProcess):
+                    lst_gps += sub_value.list_gps()
+
+        return lst_gps
+
+    def share_fit_states(self):
+        "factor all GPs and move their cached factors to shared memory before sending to worker processes"
+        for zeroGP in self.list_gps():
+            zeroGP.get_fit_state().share()
+
+        return 0
+
+    def release_fit_states(self):
+        "free shared memory of all cached factors"
+        for zeroGP in self.list_gps():
+            if zeroGP.fit_state != None:
+                zeroGP.fit_state.release()
+
+        return 0
+
+    def reset_fit_state(self):
+        "drop the cached factor, needed only after modifying points of X or Y in place"
+        self.fit_state = None
+
+        return 0
+
+    def append_observation(self, current_point, response):
+        """
+        add one experiment point (x, y) and update the cached factor by one row instead of refactoring
+        response: raw response, prior_mean is subtracted as in get_data_from_file
+        """
+        current_point = list(current_point)
+        if self.prior_mean != None:
+            response = response - self.prior_mean
+
+        # only update a factor which is still valid for the current data, otherwise factor lazily later
+        state = self.fit_state
+        update_state = (state != None) and state.is_valid(self.X, self.Y, self.theta, self.kernel_type)
+        if update_state:
+            kernel_Vec_mat = self.compute_kernel_vec(self.X, current_point, self.theta)
+            kernel_self = self.kernel(current_point, current_point, self.theta)
+
+        self.X.append(current_point)
+        self.Y.append(response)
+        self.num_points = len(self.X)
+
+        if update_state and (not state.append(current_point, response, kernel_Vec_mat, kernel_self)):
+            self.fit_state = None
+
+        return 0
 
     def compute_mle_sigma2(self):
         "compute the MLE(maximum likelihood estimation) of sigma^2"
-        response_vec = np.transpose(np.matrix(self.Y))
-        kernel_Cov_mat = self.compute_kernel_cov(self.X, self.theta)
-        inv_kernel_Cov = np.linalg.inv(kernel_Cov_mat)
-
-        sigma2_hat_A = np.matmul(np.matrix(self.Y), inv_kernel_Cov)
+        state = self.get_fit_state()
         self.num_points = len(self.Y)
-        sigma2_hat = np.matmul(sigma2_hat_A, response_vec) / self.num_points
+        sigma2_hat = np.matrix(state.sigma2_mle)
 
         return sigma2_hat
 
+    def compute_sigma2(self):
+        "return the known sigma^2 or its MLE if sigma is unknown"
+        if self.sigma2 == None:
+            return self.get_fit_state().sigma2_mle
+
+        return self.sigma2
+
     def compute_mean(self, current_point):
         "compute the mean value at current_point"
-        kernel_Cov_mat = self.compute_kernel_cov(self.X, self.theta)
+        state = self.get_fit_state()
         kernel_Vec_mat = self.compute_kernel_vec(self.X, current_point, self.theta)
-        inv_kernel_Cov = np.linalg.inv(kernel_Cov_mat)
-
-        mean_partA = np.matmul(np.transpose(kernel_Vec_mat), inv_kernel_Cov)
-        response_vec = np.transpose(np.matrix(self.Y))
-        mean = np.matmul(mean_partA, response_vec)
+        mean = np.matmul(np.transpose(kernel_Vec_mat), state.alpha)
 
         if self.prior_mean != None:
             mean[0, 0] = mean[0, 0] + self.prior_mean
 
-        # construct boundary lists
-        l_bound = find_max_min_of_each_component(self.X, max=False)
-        u_bound = find_max_min_of_each_component(self.X, max=True)
-
-        if check_inBounds(current_point, l_bound, u_bound):
+        if check_inBounds(current_point, state.l_bound, state.u_bound):
             return mean[0, 0]
         else:
             return self.r_out_bound*mean[0, 0]
     
     def compute_mean_rkhs(self):
         "compute the mean value in RKHS format at current_point"
-        kernel_Cov_mat = self.compute_kernel_cov(self.X, self.theta)
-        inv_kernel_Cov = np.linalg.inv(kernel_Cov_mat)
-
-        response_vec = np.transpose(np.matrix(self.Y))
+        state = self.get_fit_state()
 
         # introduce RKHS format
-        lst_coeff = np.transpose(np.matmul(inv_kernel_Cov, response_vec)).tolist()[0]
+        lst_coeff = state.alpha[:, 0].tolist()
         lst_mu = self.X 
 
         return lst_coeff, lst_mu
 
     def compute_grad_mean(self, current_point):
         "compute the gradient of mean(x) at current_point"
-        kernel_Cov_mat = self.compute_kernel_cov(self.X, self.theta)
-        inv_kernel_Cov = np.linalg.inv(kernel_Cov_mat)
-        response_vec = np.transpose(np.matrix(self.Y))
-        grad_partB = np.matmul(inv_kernel_Cov, response_vec)
-
-        grad_kernel_lst = []
-        for x2 in self.X:
-            grad_kernel_lst.append(self.kernel_grad(current_point, x2))
-
-        grad_kernel_mat = np.transpose(np.matrix(grad_kernel_lst))
+        grad_partB = self.get_fit_state().alpha
+        grad_kernel_mat = self.compute_grad_kernel_vec(self.X, current_point, self.theta)
 
         grad_mean = np.matmul(grad_kernel_mat, grad_partB)
 
@@ -195,54 +519,85 @@ class ZeroGProcess:
 
     def compute_s2(self, current_point):
         "compute the s^2(x) at current_point"
-        kernel_Cov_mat = self.compute_kernel_cov(self.X, self.theta)
+        state = self.get_fit_state()
         kernel_Vec_mat = self.compute_kernel_vec(self.X, current_point, self.theta)
-        inv_kernel_Cov = np.linalg.inv(kernel_Cov_mat)
 
-        s2_currentA = np.matmul(np.transpose(kernel_Vec_mat), inv_kernel_Cov)
-        s2_currentB = np.matmul(s2_currentA, kernel_Vec_mat)
+        s2_currentA = state.half_solve(kernel_Vec_mat)
+        s2_currentB = np.sum(s2_currentA**2)
         s2_current = self.kernel(current_point, current_point) - s2_currentB
 
-        return s2_current[0, 0]
+        return s2_current
 
     def compute_var(self, current_point, zeroCheck=1e-13):
         "compute the variance value at current_point"
-        kernel_Cov_mat = self.compute_kernel_cov(self.X, self.theta)
-        kernel_Vec_mat = self.compute_kernel_vec(self.X, current_point, self.theta)
-        inv_kernel_Cov = np.linalg.inv(kernel_Cov_mat)
+        s2_current = self.compute_s2(current_point)
+        var_current = self.compute_sigma2() * s2_current
 
-        s2_currentA = np.matmul(np.transpose(kernel_Vec_mat), inv_kernel_Cov)
-        s2_currentB = np.matmul(s2_currentA, kernel_Vec_mat)
-        s2_current = self.kernel(current_point, current_point) - s2_currentB
-
-        if self.sigma2 == None:
-            sigma2_hat = self.compute_mle_sigma2()
-            var_current = sigma2_hat * s2_current
-        else:
-            var_current = self.sigma2 * s2_current
-
-        if var_current[0,0] < zeroCheck: # avoid negative variance (negative but close to zero)
+        if var_current < zeroCheck: # avoid negative variance (negative but close to zero)
             return 0.0
 
-        return var_current[0, 0]
+        return var_current
 
     def compute_grad_var(self, current_point, zeroCheck=1e-13):
         "compute the gradient of var(x) at current_point"
-        if self.sigma2 == None:
-            self.sigma2 = self.compute_mle_sigma2()[0,0]
-        
-        kernel_Cov_mat = self.compute_kernel_cov(self.X, self.theta)
+        state = self.get_fit_state()
         kernel_Vec_mat = self.compute_kernel_vec(self.X, current_point, self.theta)
-        inv_kernel_Cov = np.linalg.inv(kernel_Cov_mat)
 
-        grad_var_part1 = -2*self.sigma2
+        grad_var_part1 = -2*self.compute_sigma2()
         grad_var_part2 = self.compute_grad_kernel_vec(self.X, current_point, self.theta) 
-        grad_var_part3 = np.matmul(inv_kernel_Cov, kernel_Vec_mat)
+        grad_var_part3 = state.solve(kernel_Vec_mat)
 
         grad_var = grad_var_part1 * np.matmul(grad_var_part2, grad_var_part3)
 
         return grad_var
 
+    def predict_batch(self, points, return_grad=False, zeroCheck=1e-13):
+        """
+        compute mean & variance (and their gradients) at all rows of points (m*d) in one pass
+        return: mean (m,), var (m,) [, grad_mean (m*d), grad_var (m*d)]
+        """
+        state = self.get_fit_state()
+        arr_points = np.reshape(np.asarray(points, dtype=float), (-1, state.X.shape[1]))
+
+        kernel_Cross = self.compute_kernel_cross(state.X, arr_points, self.theta)   # (t*m)
+        mean = kernel_Cross.T @ state.alpha[:, 0]
+
+        if self.prior_mean != None:
+            mean = mean + self.prior_mean
+
+        # same ratio outside of the box spanned by experiment points as compute_mean
+        in_zone = np.all((arr_points >= state.l_bound) & (arr_points <= state.u_bound), axis=1)
+        mean = np.where(in_zone, mean, self.r_out_bound*mean)
+
+        sigma2 = self.compute_sigma2()
+        s2_currentA = state.half_solve(kernel_Cross)
+        s2 = 1.0 - np.sum(s2_currentA**2, axis=0)   # k(x, x) = 1 for gaussian kernel
+        var = sigma2 * s2
+        var[var < zeroCheck] = 0.0                  # avoid negative variance (negative but close to zero)
+
+        if not return_grad:
+            return mean, var
+
+        grad_mean = self.compute_grad_kernel_batch(state.X, arr_points, kernel_Cross * state.alpha, self.theta)
+
+        inv_kernel_Cross = state.solve(kernel_Cross)
+        grad_var = -2*sigma2 * self.compute_grad_kernel_batch(state.X, arr_points, kernel_Cross * inv_kernel_Cross, self.theta)
+
+        return mean, var, grad_mean, grad_var
+
+    def conf_interval_batch(self, points, confidence=0.9):
+        "compute the two sided confidence intervals at all rows of points (m*d)"
+        alpha = (1 - confidence) / 2.
+        lower_bound_std = norm.ppf(alpha)
+        upper_bound_std = norm.ppf(1 - alpha)
+
+        mean, var = self.predict_batch(points)
+
+        lower_bound = mean + np.sqrt(var)*lower_bound_std
+        upper_bound = mean + np.sqrt(var)*upper_bound_std
+
+        return lower_bound, upper_bound
+
     def conf_interval(self, current_point, confidence=0.9):
         "compute the confidence interval with two sides"
         alpha = (1 - confidence) / 2.
@@ -287,15 +642,8 @@ class ZeroGProcess:
             min_dist_index = np.where(d_pnt_sample==np.min(d_pnt_sample))[0][0]
             sample_scaled_sorted.pop(min_dist_index)
 
-        # write header and prior points in out_file
-        feat_tag = ["#dim"+str(i+1) for i in range(self.dim)]
-        first_line = "response"
-
-        for i in range(self.dim):
-            first_line = first_line + feat_tag[i]
-            
-        with open(out_file, "w", encoding="utf-8") as f_out:
-            f_out.writelines(first_line + '\n')
+        # write header and prior points in out_file (TSV, or binary if out_file ends with points_io.BINARY_SUFFIX)
+        write_table(out_file, default_columns(self.dim), [])
         
         for pnt, rel_qunt in prior_points:
             res_pnt = mean + (rel_qunt-1)*np.abs(mean)
@@ -362,11 +710,8 @@ class ZeroGProcess:
 
         x_draw = np.linspace(min_point-exp_ratio*delta, max_point+exp_ratio*delta, num_points)
 
-        y_mean = [self.compute_mean([ele]) for ele in x_draw]
-
-        y_conf_int = [self.conf_interval([ele], confidence) for ele in x_draw]
-        y_lower = [ele[0] for ele in y_conf_int]
-        y_upper = [ele[1] for ele in y_conf_int]
+        y_mean, _ = self.predict_batch(x_draw[:, None])
+        y_lower, y_upper = self.conf_interval_batch(x_draw[:, None], confidence)
 
         fig, ax = plt.subplots()
         ax.plot(x_draw, y_mean)
@@ -1,15 +1,159 @@
 #!/usr/bin/env python3
 
-import os, copy
+import os, copy, pickle
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib import cm
 from scipy.stats import norm
 from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor
 from gp import ZeroGProcess
 from utils import check_inBounds, find_max_min_of_each_component
 
 
+def multi_start_adam(value_grad_func, init_points, num_step=1000, l_bounds=None, u_bounds=None,
+                     thres=1e-3, learn_rate=0.1, beta_1=0.9, beta_2=0.999, epslon=1e-8):
+    """
+    Find local maximum points of an acquisition function from all init_points (k*d) simultaneously by ADAM algorithm.
+    value_grad_func: points (m*d) => values (m,), gradients (m*d)
+    l_bounds/u_bounds: points are projected back into the bounds instead of stopping at the boundary
+    thres: a start point stops once its step is shorter than thres
+    return: local maximum points (k*d), values at local maximum points (k,)
+    """
+    points = np.array(init_points, dtype=float)
+    points = np.reshape(points, (len(points), -1))
+
+    # optimize in bounds
+    in_bounds = (l_bounds is not None) or (u_bounds is not None)
+
+    if l_bounds is not None:
+        l_bounds = np.array(l_bounds, dtype=float)
+        assert(len(l_bounds) == points.shape[1])
+
+    if u_bounds is not None:
+        u_bounds = np.array(u_bounds, dtype=float)
+        assert(len(u_bounds) == points.shape[1])
+
+    if in_bounds:
+        points = np.clip(points, l_bounds, u_bounds)
+
+    # initialize momentum & rmsp vectors & gradients at init points
+    m_t = np.zeros(shape=points.shape)
+    gamma_t = np.zeros(shape=points.shape)
+    values, grads = value_grad_func(points)
+    active = np.ones(len(points), dtype=bool)   # start points not converged yet
+
+    for t in range(num_step):
+        if not np.any(active):
+            break
+
+        m_t[active] = beta_1*m_t[active] + (1 - beta_1)*grads[active]
+        gamma_t[active] = beta_2*gamma_t[active] + (1 - beta_2)*grads[active]**2
+
+        # BC (bias correct) m_t and gamma_t, same as find_best_from_point_ei
+        m_t_BC = m_t[active] / (1 - beta_1)
+        gamma_t_BC = gamma_t[active] / (1 - beta_2)
+
+        points_next = points[active] + m_t_BC * learn_rate / np.sqrt(gamma_t_BC + epslon)
+        if in_bounds:
+            points_next = np.clip(points_next, l_bounds, u_bounds)
+
+        step_norm = np.linalg.norm(points_next - points[active], axis=1)
+        points[active] = points_next
+        values[active], grads[active] = value_grad_func(points_next)
+
+        # stop start points with short steps
+        active[np.flatnonzero(active)[step_norm < thres]] = False
+
+    return points, values
+
+
+# models used by the worker processes of an AcquisitionPool {id of model in the main process: (version, model)}
+worker_models = {}
+
+def find_local_optima_worker(model_id, version, model_bytes, method_name, init_points, opt_kwargs):
+    "run vectorized ADAM (model.method_name) from a chunk of start points in a worker process, unpickle model only if its version is new"
+    if (model_id not in worker_models) or (worker_models[model_id][0] != version):
+        worker_models[model_id] = (version, pickle.loads(model_bytes))   # cached factors are attached from shared memory
+
+    return getattr(worker_models[model_id][1], method_name)(init_points, **opt_kwargs)
+
+
+class AcquisitionPool:
+    """
+    Class AcquisitionPool: process pool for multi-start AC optimization, kept over all rounds of a BO campaign
+        with AcquisitionPool(num_workers) as pool:
+            model.find_best_NextPoint_ei(start_points, pool=pool)
+    cached factors of a model are moved to shared memory once and republished only after they changed,
+    e.g. the factor of task1 GP of STBO stays in the same shared memory block over all rounds of task 2
+    """
+    def __init__(self, num_workers):
+        self.num_workers = num_workers
+        self.executor = ProcessPoolExecutor(max_workers=num_workers)
+        self.published = {}     # id(model) => (model, fitted states of model in shared memory)
+        self.version = 0        # version of the last published model
+
+    def publish(self, model):
+        "share the cached factors of all GPs in model, free shared factors which model does not use anymore"
+        states = [zeroGP.get_fit_state() for zeroGP in model.list_gps()]
+        for state in states:
+            state.share()           # no-op for an unchanged factor
+
+        if id(model) in self.published:
+            for state in self.published[id(model)][1]:
+                if not any([state is current_state for current_state in states]):
+                    state.release()
+
+        self.published[id(model)] = (model, states)
+        self.version += 1
+
+        return self.version
+
+    def map_local_optima(self, model, method_name, init_points, opt_kwargs):
+        """
+        split init_points over the worker processes running model.method_name,
+        model is pickled once per call (without its shared factors) and unpickled at most once per worker
+        return: local maximum points (k*d), values at local maximum points (k,)
+        """
+        chunks = np.array_split(np.array(init_points, dtype=float), min(self.num_workers, len(init_points)))
+
+        version = self.publish(model)
+        model_bytes = pickle.dumps(model)
+
+        futures = [self.executor.submit(find_local_optima_worker, id(model), version, model_bytes, method_name, chunk, opt_kwargs) for chunk in chunks]
+        results = [future.result() for future in futures]
+
+        local_points = np.vstack([points for points, _ in results])
+        local_values = np.concatenate([values for _, values in results])
+
+        return local_points, local_values
+
+    def close(self):
+        "stop the worker processes and free all shared factors"
+        self.executor.shutdown()
+        for _, states in self.published.values():
+            for state in states:
+                state.release()
+        self.published = {}
+
+        return 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def map_local_optima(model, method_name, init_points, opt_kwargs, num_workers):
+    """
+    split init_points over a process pool with num_workers processes running model.method_name,
+    the pool lives for this call only, keep an AcquisitionPool over the rounds of a campaign instead
+    return: local maximum points (k*d), values at local maximum points (k,)
+    """
+    with AcquisitionPool(min(num_workers, len(init_points))) as pool:
+        return pool.map_local_optima(model, method_name, init_points, opt_kwargs)
+
+
 class UpperConfidenceBound(ZeroGProcess):
     """
     class UpperConfidenceBound: 1. construct UCB auxillary function
@@ -23,27 +167,92 @@ class UpperConfidenceBound(ZeroGProcess):
         """
         Acquisition function: a(x|D_t) = mean(x) + current_gamma * s2(x)
         """
-        kernel_Cov_mat = self.compute_kernel_cov(self.X, self.theta)
-        kernel_Vec_mat = self.compute_kernel_vec(self.X, current_point, self.theta)
-        inv_kernel_Cov = np.linalg.inv(kernel_Cov_mat)
-
-        s2_currentA = np.matmul(np.transpose(kernel_Vec_mat), inv_kernel_Cov)
-        s2_currentB = np.matmul(s2_currentA, kernel_Vec_mat)
-        s2_current = self.kernel(current_point, current_point) - s2_currentB        
+        s2_current = self.compute_s2(current_point)
 
         mean_current = self.compute_mean(current_point)
         aux_ucb_current = mean_current + current_gamma*s2_current
 
-        return aux_ucb_current[0, 0]
+        return aux_ucb_current
+
+    def auto_grad_ucb(self, current_point, current_gamma=0.9, zeroCheck=1e-13):
+        """
+        compute gradient of UCB at current_point, vector (d*1)
+        grad = grad_mean(x) + current_gamma * grad_var(x) / sigma^2
+        """
+        grad_mean = np.asarray(self.compute_grad_mean(current_point))
+        grad_s2 = np.asarray(self.compute_grad_var(current_point)) / max(self.compute_sigma2(), zeroCheck)
+
+        grad_ucb_current = grad_mean + current_gamma*grad_s2
+
+        return grad_ucb_current
+
+    def compute_ucb_batch(self, points, current_gamma=0.9, return_grad=False, zeroCheck=1e-13):
+        """
+        compute UCB acquisition function (and its analytic gradient) at all rows of points (m*d)
+        return: aux values (m,) [, gradients (m*d)]
+        """
+        sigma2 = max(self.compute_sigma2(), zeroCheck)
+
+        if return_grad:
+            mean, var, grad_mean, grad_var = self.predict_batch(points, return_grad=True, zeroCheck=zeroCheck)
+        else:
+            mean, var = self.predict_batch(points, zeroCheck=zeroCheck)
+
+        aux_ucb = mean + current_gamma*var/sigma2
+
+        if not return_grad:
+            return aux_ucb
+
+        grad_ucb = grad_mean + current_gamma*grad_var/sigma2
+
+        return aux_ucb, grad_ucb
+
+    def find_local_optima_ucb(self, init_points=None, num_step=1000, current_gamma=0.9, l_bounds=None, u_bounds=None,
+                              thres=1e-3, learn_rate=0.1, beta_1=0.9, beta_2=0.999, epslon=1e-8, num_workers=None, pool=None):
+        """ find local maximum points of UCB from all init_points at once by vectorized ADAM algorithm
+            init_points: init_points = experiment points if None,
+            num_workers: split start points over a process pool with num_workers processes if > 1
+            pool: AcquisitionPool kept over the rounds of a campaign, used instead of a new pool of num_workers processes
+            return: local maximum points (k*d), UCB values at local maximum points (k,)
+        """
+        if init_points is None:
+            init_points = self.X
+
+        opt_kwargs = {"num_step": num_step, "current_gamma": current_gamma, "l_bounds": l_bounds, "u_bounds": u_bounds,
+                      "thres": thres, "learn_rate": learn_rate, "beta_1": beta_1, "beta_2": beta_2, "epslon": epslon}
+
+        if (pool != None) and (len(init_points) > 1):
+            return pool.map_local_optima(self, "find_local_optima_ucb", init_points, opt_kwargs)
 
-    def auto_grad_ucb(self, current_point):
-        "compute gradient at current_point"
+        if (num_workers != None) and (num_workers > 1) and (len(init_points) > 1):
+            return map_local_optima(self, "find_local_optima_ucb", init_points, opt_kwargs, num_workers)
 
-        pass 
+        value_grad_func = lambda points: self.compute_ucb_batch(points, current_gamma, return_grad=True)
+        local_points, local_aux = multi_start_adam(value_grad_func, init_points, num_step, l_bounds, u_bounds,
+                                                   thres, learn_rate, beta_1, beta_2, epslon)
 
-    def find_NextBest_point_ucb(self):
-        "find maximum point based on Acquisition function"
-        pass
+        return local_points, local_aux
+
+    def find_NextBest_point_ucb(self, init_points=None, num_step=1000, current_gamma=0.9, l_bounds=None, u_bounds=None,
+                                thres=1e-3, learn_rate=0.1, beta_1=0.9, beta_2=0.999, epslon=1e-8, num_workers=None, num_refine=None, pool=None):
+        """ find best next point of UCB Acquisition function by starting from multi-points
+            init_points: init_points = experiment points if None,
+            num_workers, pool: number of worker processes or AcquisitionPool, see find_local_optima_ucb
+            num_refine: if not None, ADAM starts only from the num_refine init_points with largest UCB
+        """
+        if init_points is None:
+            init_points = self.X
+
+        if (num_refine != None) and (num_refine < len(init_points)):
+            candidates = np.reshape(np.array(init_points, dtype=float), (len(init_points), -1))
+            aux_candidates = self.compute_ucb_batch(candidates, current_gamma)
+            init_points = candidates[np.argsort(-aux_candidates, kind="stable")[:num_refine]]
+
+        local_points, local_aux = self.find_local_optima_ucb(init_points, num_step, current_gamma, l_bounds, u_bounds,
+                                                             thres, learn_rate, beta_1, beta_2, epslon, num_workers, pool)
+        best_index = np.argmax(local_aux)
+
+        return local_points[best_index].tolist(), local_aux[best_index]
 
     def plot(self, num_points=100, exp_ratio=1, confidence=0.9, gammas=[0.9]):
         "plot the acquisition function as well as ZeroGP in a figure with two figs"
@@ -54,19 +263,17 @@ class UpperConfidenceBound(ZeroGProcess):
         x_draw = np.linspace(min_point-exp_ratio*delta, max_point+exp_ratio*delta, num_points)
 
         # subplot 1: GProcess mean & confidence band
-        y_mean = [self.compute_mean([ele]) for ele in x_draw]
-        y_conf_int = [self.conf_interval([ele], confidence) for ele in x_draw]
-        y_lower = [ele[0] for ele in y_conf_int]
-        y_upper = [ele[1] for ele in y_conf_int]
+        y_mean, _ = self.predict_batch(x_draw[:, None])
+        y_lower, y_upper = self.conf_interval_batch(x_draw[:, None], confidence)
 
         # subplot 2: UCB AC function with multiple parameters
         ac_values_lst = []
         if isinstance(gammas, list):
             for gamma in gammas:
-                ac_gamma = [self.aux_func_ucb([ele], gamma) for ele in x_draw]
+                ac_gamma = self.compute_ucb_batch(x_draw[:, None], gamma)
                 ac_values_lst.append(ac_gamma)
         elif isinstance(gammas, float):
-            ac_gamma = [self.aux_func_ucb([ele], gammas) for ele in x_draw]
+            ac_gamma = self.compute_ucb_batch(x_draw[:, None], gammas)
             ac_values_lst.append(ac_gamma)
             gammas = [gammas]
 
@@ -117,41 +324,76 @@ class ExpectedImprovement(ZeroGProcess):
 
         return aux_ei_current
 
-    def auto_grad_ei(self, current_point, num_mc=1000, kessi=0.0, zeroCheck=1e-13):
-        "compute gradient at current_point by Monte Carlo method after reparameterization"
+    def auto_grad_ei(self, current_point, num_mc=1000, kessi=0.0, zeroCheck=1e-13, grad_type="analytic"):
+        """
+        compute gradient of EI at current_point, vector (d*1)
+        grad_type: "analytic", grad = F(Z)*grad_mean(x) + f(Z)*grad_sqrt(var(x))
+                   "mc", Monte Carlo method after reparameterization with num_mc samples (for validation)
+        """
         y_max = max(self.Y)
-
-        if self.sigma2 == None:
-            self.sigma2 = self.compute_mle_sigma2()[0,0]
+        dim = len(current_point)
 
         mean_current = self.compute_mean(current_point)
         var_current = self.compute_var(current_point, zeroCheck)
 
-        grads_current_util = []
-        
-        for i in range(num_mc):
-            z = np.random.normal(0, 1, 1)
-            current_util = mean_current + np.sqrt(var_current)*z + kessi - y_max
+        if grad_type == "mc":
+            z = np.random.normal(0, 1, num_mc)
 
-            if (current_util < zeroCheck) or (np.sqrt(var_current) < zeroCheck): # pointwise utility function \hat{l}(x)<0 ===> grad = 0
-                grad = np.zeros(shape=(self.dim, 1))
-            else:
-                grad_mean = self.compute_grad_mean(current_point)
-                grad_var = 0.5 / np.sqrt(var_current) * self.compute_grad_var(current_point)
-                grad = grad_mean + grad_var * z
-            
-            grads_current_util.append(grad)
+        if np.sqrt(var_current) < zeroCheck:
+            return np.zeros(shape=(dim, 1))
+
+        grad_mean = np.asarray(self.compute_grad_mean(current_point))
+        grad_std = 0.5 / np.sqrt(var_current) * np.asarray(self.compute_grad_var(current_point))
 
-        grad_current_util = np.mean(grads_current_util, axis=0) # take element-wise mean 
+        if grad_type == "analytic":
+            Z = (mean_current - y_max + kessi) / np.sqrt(var_current)
+            grad_current_util = norm.cdf(Z)*grad_mean + norm.pdf(Z)*grad_std
+        elif grad_type == "mc":
+            # pointwise utility function \hat{l}(x)<0 ===> grad = 0
+            current_util = mean_current + np.sqrt(var_current)*z + kessi - y_max
+            util_positive = current_util >= zeroCheck
+            grad_current_util = (np.sum(util_positive)*grad_mean + np.sum(z[util_positive])*grad_std) / num_mc
+        else:
+            raise(TypeError)
 
         return grad_current_util
 
+    def compute_ei_batch(self, points, kessi=0.0, return_grad=False, zeroCheck=1e-13):
+        """
+        compute EI acquisition function (and its analytic gradient) at all rows of points (m*d)
+        return: aux values (m,) [, gradients (m*d)]
+        """
+        y_max = max(self.Y)
+
+        if return_grad:
+            mean, var, grad_mean, grad_var = self.predict_batch(points, return_grad=True, zeroCheck=zeroCheck)
+        else:
+            mean, var = self.predict_batch(points, zeroCheck=zeroCheck)
+
+        positive = var >= zeroCheck
+        std = np.sqrt(np.where(positive, var, 1.0))
+
+        Z_denom = mean - y_max + kessi
+        Z = Z_denom / std
+
+        aux_ei = np.where(positive, Z_denom*norm.cdf(Z) + std*norm.pdf(Z), 0.0)
+
+        if not return_grad:
+            return aux_ei
+
+        grad_std = 0.5 / std[:, None] * grad_var
+        grad_ei = norm.cdf(Z)[:, None]*grad_mean + norm.pdf(Z)[:, None]*grad_std
+        grad_ei[~positive] = 0.0
+
+        return aux_ei, grad_ei
+
     def find_best_from_point_ei(self, init_point, num_step=1000, kessi=0.0, l_bounds=None, u_bounds=None,
-                                num_mc=1000, thres=1e-3, learn_rate=0.1, beta_1=0.9, beta_2=0.999, epslon=1e-8):
+                                num_mc=1000, thres=1e-3, learn_rate=0.1, beta_1=0.9, beta_2=0.999, epslon=1e-8, grad_type="analytic"):
         """
         Find maximum point of Acquisition function in bounds from init_point by using ADAM algorithm.
         l_bounds: [l_1, l_2, ..., l_d]
         u_bounds: [u_1, u_2, ..., u_d]
+        grad_type: "analytic" | "mc", see auto_grad_ei
         """
         dim = self.dim
         assert(len(init_point) == dim)
@@ -171,7 +413,7 @@ class ExpectedImprovement(ZeroGProcess):
         aux_current = self.aux_func_ei(point_current, kessi)
 
         for t in range(num_step):
-            grad_current = self.auto_grad_ei(point_current, num_mc, kessi)
+            grad_current = self.auto_grad_ei(point_current, num_mc, kessi, grad_type=grad_type)
             m_t = beta_1*m_t + (1 - beta_1)*grad_current
             gamma_t = beta_2*gamma_t + (1 - beta_2)*grad_current**2
 
@@ -193,19 +435,73 @@ class ExpectedImprovement(ZeroGProcess):
         return point_current, aux_current
 
 
+    def find_local_optima_ei(self, init_points=None, num_step=1000, kessi=0.0, l_bounds=None, u_bounds=None,
+                             thres=1e-3, learn_rate=0.1, beta_1=0.9, beta_2=0.999, epslon=1e-8, num_workers=None, pool=None):
+        """ find local maximum points of EI from all init_points at once by vectorized ADAM algorithm
+            init_points: init_points = experiment points if None,
+            num_workers: split start points over a process pool with num_workers processes if > 1,
+                         cached factors are shared once per worker by shared memory
+            pool: AcquisitionPool kept over the rounds of a campaign, used instead of a new pool of num_workers processes
+            return: local maximum points (k*d), EI values at local maximum points (k,)
+        """
+        if init_points is None:
+            init_points = self.X
+
+        opt_kwargs = {"num_step": num_step, "kessi": kessi, "l_bounds": l_bounds, "u_bounds": u_bounds, "thres": thres,
+                      "learn_rate": learn_rate, "beta_1": beta_1, "beta_2": beta_2, "epslon": epslon}
+
+        if (pool != None) and (len(init_points) > 1):
+            return pool.map_local_optima(self, "find_local_optima_ei", init_points, opt_kwargs)
+
+        if (num_workers != None) and (num_workers > 1) and (len(init_points) > 1):
+            return map_local_optima(self, "find_local_optima_ei", init_points, opt_kwargs, num_workers)
+
+        value_grad_func = lambda points: self.compute_ei_batch(points, kessi, return_grad=True)
+        local_points, local_aux = multi_start_adam(value_grad_func, init_points, num_step, l_bounds, u_bounds,
+                                                   thres, learn_rate, beta_1, beta_2, epslon)
+
+        return local_points, local_aux
+
+    def prescreen_points_ei(self, candidates, num_refine=10, kessi=0.0):
+        """ pick the num_refine candidates (m*d) with largest EI by one batched prediction
+            return: start points (num_refine*d), ordered by decreasing EI
+        """
+        candidates = np.array(candidates, dtype=float)
+        candidates = np.reshape(candidates, (len(candidates), -1))
+
+        aux_candidates = self.compute_ei_batch(candidates, kessi)
+        top_index = np.argsort(-aux_candidates, kind="stable")[:num_refine]
+
+        return candidates[top_index]
+
     def find_best_NextPoint_ei(self, init_points=None, num_step=1000, kessi=0.0, l_bounds=None, u_bounds=None,
-                               num_mc=1000, thres=1e-3, learn_rate=0.1, beta_1=0.9, beta_2=0.999, epslon=1e-8):
+                               num_mc=1000, thres=1e-3, learn_rate=0.1, beta_1=0.9, beta_2=0.999, epslon=1e-8, grad_type="analytic",
+                               batch=True, num_workers=None, num_refine=None, pool=None):
         """ find best next point of Acquisition function by starting from multi-points
             init_points: init_points = experiment points if None,
+            batch: optimize all start points at once (analytic gradient only), otherwise one by one
+            num_workers, pool: number of worker processes or AcquisitionPool for the batched search, see find_local_optima_ei
+            num_refine: if not None, init_points are candidates (e.g. from sample_quasi_random) and ADAM
+                        starts only from the num_refine candidates with largest EI, see prescreen_points_ei
         """
-        if init_points == None:
+        if init_points is None:
             init_points = self.X
 
+        if (num_refine != None) and (num_refine < len(init_points)):
+            init_points = self.prescreen_points_ei(init_points, num_refine, kessi).tolist()
+
+        if batch and grad_type == "analytic":
+            local_points, local_aux = self.find_local_optima_ei(init_points, num_step, kessi, l_bounds, u_bounds,
+                                                                thres, learn_rate, beta_1, beta_2, epslon, num_workers, pool)
+            best_index = np.argmax(local_aux)
+
+            return local_points[best_index].tolist(), local_aux[best_index]
+
         best_points_aux = []
 
         for point_k in init_points:
             best_point_k, best_aux_k = self.find_best_from_point_ei(point_k, num_step, kessi, l_bounds, u_bounds, num_mc,
-                                                                    thres, learn_rate, beta_1, beta_2, epslon)
+                                                                    thres, learn_rate, beta_1, beta_2, epslon, grad_type)
             best_points_aux.append((best_point_k, best_aux_k))
 
         best_point, best_aux = max(best_points_aux, key=itemgetter(1))
@@ -221,10 +517,8 @@ class ExpectedImprovement(ZeroGProcess):
         x_draw = np.linspace(min_point-exp_ratio*delta, max_point+exp_ratio*delta, num_points)
         print("theta Gp: ", self.theta)
         # subplot 1: GProcess mean & confidence band
-        y_mean = [self.compute_mean([ele]) for ele in x_draw]
-        y_conf_int = [self.conf_interval([ele], confidence) for ele in x_draw]
-        y_lower = [ele[0] for ele in y_conf_int]
-        y_upper = [ele[1] for ele in y_conf_int]
+        y_mean, _ = self.predict_batch(x_draw[:, None])
+        y_lower, y_upper = self.conf_interval_batch(x_draw[:, None], confidence)
 
         # subplot 2: EI AC function with multiple parameters
         ac_values_lst = []
@@ -271,23 +565,35 @@ class ShapeTransferBO(ExpectedImprovement, UpperConfidenceBound):
         super(ShapeTransferBO, self).__init__()
         self.zeroGP1 = None
         self.diffGP = None
+        self.mean_GP1_cache = {}    # task1 GP mean at seen task2 points, keyed by tuple(point)
 
-    def build_task1_gp(self, file_exp_task1, theta_task1=1.0, prior_mean=None, r_out_bound=0.5):
+    def build_task1_gp(self, file_exp_task1, theta_task1=1.0, prior_mean=None, r_out_bound=0.5, cache_dir=None):
         """
         build ZeroGProcess for task1 with known experiment points
         theta_task1: float, kernel coefficient used in task 1
         prior_mean:  constant mean used in building GP 1 
         r_out_bound: ratio of mean used in out of boundary 
+        cache_dir:   load / save the fitted GP 1 there if not None, see ZeroGProcess.get_data_from_file_cached
         """
         zeroGP1 = ZeroGProcess(prior_mean=prior_mean, r_out_bound=r_out_bound)
-        zeroGP1.get_data_from_file(file_exp_task1)
         zeroGP1.theta = theta_task1
+        zeroGP1.get_data_from_file_cached(file_exp_task1, cache_dir)
         assert(len(zeroGP1.X) == len(zeroGP1.Y))
 
         self.zeroGP1 = zeroGP1
+        self.mean_GP1_cache = {}
 
         return 0
 
+    def compute_mean_task1(self, current_point):
+        "compute the mean value of GP1 at current_point, memoized since task1 is fixed during task2"
+        key = tuple(float(ele) for ele in current_point)
+
+        if key not in self.mean_GP1_cache:
+            self.mean_GP1_cache[key] = self.zeroGP1.compute_mean(list(current_point))
+
+        return self.mean_GP1_cache[key]
+
     def build_diff_gp(self):
         "build ZeroGProcess on difference between task2 and task1_gp"
 
@@ -301,16 +607,25 @@ class ShapeTransferBO(ExpectedImprovement, UpperConfidenceBound):
         diff_Y = []
 
         for point, y_task2 in zip(X_task2, Y_task2):
-            mean_GP1_point = self.zeroGP1.compute_mean(point)
+            mean_GP1_point = self.compute_mean_task1(point)
             diff_y_point = y_task2 - mean_GP1_point
             diff_Y.append(diff_y_point)
         
         diffGP.Y = diff_Y
-        diffGP.X = self.X
+        diffGP.X = copy.deepcopy(self.X)
         self.diffGP = diffGP
 
         return 0
 
+    def append_observation(self, current_point, response):
+        "add one task2 point to both task2 data and diffGP, update cached factors by one row"
+        super(ShapeTransferBO, self).append_observation(current_point, response)
+
+        diff_y_point = response - self.compute_mean_task1(current_point)
+        self.diffGP.append_observation(current_point, diff_y_point)
+
+        return 0
+
     def compute_mean(self, current_point):
         "compute the mean value of GP1 + diffGP at current_point"
         mean_GP1 = self.zeroGP1.compute_mean(current_point)
@@ -339,6 +654,14 @@ class ShapeTransferBO(ExpectedImprovement, UpperConfidenceBound):
 
         return sigma2_hat
 
+    def compute_sigma2(self):
+        "return sigma^2 of diffGP, GP1 is simply treated as constant function without randomness"
+        return self.diffGP.compute_sigma2()
+
+    def compute_s2(self, current_point):
+        "compute the s^2(x) of diffGP at current_point"
+        return self.diffGP.compute_s2(current_point)
+
     def compute_var(self, current_point, zeroCheck=1e-13):
         """
         compute the variance value of GP1 + diffGP at current_point
@@ -358,6 +681,25 @@ class ShapeTransferBO(ExpectedImprovement, UpperConfidenceBound):
 
         return grad_var
 
+    def predict_batch(self, points, return_grad=False, zeroCheck=1e-13):
+        """
+        compute mean & variance (and their gradients) of GP1 + diffGP at all rows of points (m*d)
+        Note: GP1 is simply treated as constant function without randomness
+        """
+        pred_GP1 = self.zeroGP1.predict_batch(points, return_grad, zeroCheck)
+        pred_diffGP = self.diffGP.predict_batch(points, return_grad, zeroCheck)
+
+        mean = pred_GP1[0] + pred_diffGP[0]
+        var = pred_diffGP[1]
+
+        if not return_grad:
+            return mean, var
+
+        grad_mean = pred_GP1[2] + pred_diffGP[2]
+        grad_var = pred_diffGP[3]
+
+        return mean, var, grad_mean, grad_var
+
     def plot_ac(self, exp_ratio=0.5, kessis=[0.0]):
         fig = plt.figure(figsize=plt.figaspect(0.5))
         #fig.suptilte("AC function optimization checking",)
@@ -409,31 +751,22 @@ class ShapeTransferBO(ExpectedImprovement, UpperConfidenceBound):
 
         # subplot 1: GProcess means & confidence bands of zeroGP1 (on data 1) and diffGP (on task2 - mean1)
         GP1 = self.zeroGP1
-        y1_mean = [GP1.compute_mean([ele]) for ele in x_draw]
-
-        y1_conf_int = [GP1.conf_interval([ele]) for ele in x_draw]
-        y1_lower = [ele[0] for ele in y1_conf_int]
-        y1_upper = [ele[1] for ele in y1_conf_int]
+        y1_mean, _ = GP1.predict_batch(x_draw[:, None])
+        y1_lower, y1_upper = GP1.conf_interval_batch(x_draw[:, None])
 
         diffGP = self.diffGP
-        yDiff_mean = [diffGP.compute_mean([ele]) for ele in x_draw]
-        yDiff_conf_int = [diffGP.conf_interval([ele]) for ele in x_draw]
-        yDiff_lower = [ele[0] for ele in yDiff_conf_int]
-        yDiff_upper = [ele[1] for ele in yDiff_conf_int]
+        yDiff_mean, _ = diffGP.predict_batch(x_draw[:, None])
+        yDiff_lower, yDiff_upper = diffGP.conf_interval_batch(x_draw[:, None])
 
         # subplot 2: GProcess means & confidence bands of GP2 (normal zero GP on data 2) and STBO
         GP2_only = ZeroGProcess()
         GP2_only.X = self.X
         GP2_only.Y = self.Y
-        y2Only_mean = [GP2_only.compute_mean([ele]) for ele in x_draw]
-        y2Only_conf_int = [GP2_only.conf_interval([ele], confidence) for ele in x_draw]
-        y2Only_lower = [ele[0] for ele in y2Only_conf_int]
-        y2Only_upper = [ele[1] for ele in y2Only_conf_int]
+        y2Only_mean, _ = GP2_only.predict_batch(x_draw[:, None])
+        y2Only_lower, y2Only_upper = GP2_only.conf_interval_batch(x_draw[:, None], confidence)
 
-        y_mean = [self.compute_mean([ele]) for ele in x_draw]
-        y_conf_int = [self.conf_interval([ele], confidence) for ele in x_draw]
-        y_lower = [ele[0] for ele in y_conf_int]
-        y_upper = [ele[1] for ele in y_conf_int]
+        y_mean, _ = self.predict_batch(x_draw[:, None])
+        y_lower, y_upper = self.conf_interval_batch(x_draw[:, None], confidence)
 
         # subplot 3: EI AC function with multiple parameters 
         ac_values_lst = []
@@ -490,6 +823,164 @@ class ShapeTransferBO(ExpectedImprovement, UpperConfidenceBound):
         return 0
 
 
+class StackedShapeTransferBO(ExpectedImprovement, UpperConfidenceBound):
+    """
+    class StackedShapeTransferBO: ShapeTransferBO with N source tasks
+        source layer 1 models source task 1, source layer k models the residual of source task k
+        on the stack of layers 1..k-1, diffGP models the residual of the target task on all layers
+    """
+    def __init__(self):
+        super(StackedShapeTransferBO, self).__init__()
+        self.source_gps = []
+        self.source_keys = []           # artifact keys of source layers, each key depends on all lower layers
+        self.diffGP = None
+        self.mean_sources_cache = {}    # stacked source mean at seen target points, keyed by tuple(point)
+
+    def add_source_gp(self, file_exp_source, theta_source=1.0, prior_mean=None, r_out_bound=0.5, cache_dir=None):
+        """
+        build ZeroGProcess for the next source task on its residual of the current stack
+        theta_source, prior_mean, r_out_bound, cache_dir: as in ShapeTransferBO.build_task1_gp
+        """
+        sourceGP = ZeroGProcess(prior_mean=prior_mean, r_out_bound=r_out_bound)
+        sourceGP.theta = theta_source
+
+        parent_key = self.source_keys[-1] if len(self.source_keys) > 0 else ""
+        source_key = sourceGP.artifact_key(file_exp_source, parent_key)
+
+        if (cache_dir == None) or (not sourceGP.load_fit_state(os.path.join(cache_dir, source_key))):
+            sourceGP.get_data_from_file(file_exp_source)
+
+            if len(self.source_gps) > 0:
+                mean_stack, _ = self.predict_sources_batch(sourceGP.X)
+                sourceGP.Y = [y - mean_y for y, mean_y in zip(sourceGP.Y, mean_stack)]
+
+            if cache_dir != None:
+                sourceGP.save_fit_state(os.path.join(cache_dir, source_key))
+
+        assert(len(sourceGP.X) == len(sourceGP.Y))
+
+        self.source_gps.append(sourceGP)
+        self.source_keys.append(source_key)
+        self.mean_sources_cache = {}
+
+        return 0
+
+    def predict_sources_batch(self, points, return_grad=False, zeroCheck=1e-13):
+        """
+        compute the stacked mean (and its gradient) of all source layers at all rows of points (m*d)
+        return: mean (m,), grad_mean (m*d) or None
+        """
+        assert(len(self.source_gps) > 0)
+        mean = 0
+        grad_mean = 0
+
+        for sourceGP in self.source_gps:
+            pred_source = sourceGP.predict_batch(points, return_grad, zeroCheck)
+            mean = mean + pred_source[0]
+            if return_grad:
+                grad_mean = grad_mean + pred_source[2]
+
+        if not return_grad:
+            return mean, None
+
+        return mean, grad_mean
+
+    def compute_mean_sources(self, current_point):
+        "compute the stacked mean of all source layers at current_point, memoized since source tasks are fixed"
+        key = tuple(float(ele) for ele in current_point)
+
+        if key not in self.mean_sources_cache:
+            mean_stack, _ = self.predict_sources_batch([list(current_point)])
+            self.mean_sources_cache[key] = mean_stack[0]
+
+        return self.mean_sources_cache[key]
+
+    def build_diff_gp(self):
+        "build ZeroGProcess on difference between target task and the stack of source layers"
+
+        diffGP = ZeroGProcess()
+        assert(len(self.X) == len(self.Y))
+
+        # stacked means at all unseen target points in one batched pass
+        new_points = [point for point in self.X if tuple(float(ele) for ele in point) not in self.mean_sources_cache]
+        if len(new_points) > 0:
+            mean_stack, _ = self.predict_sources_batch(new_points)
+            for point, mean_point in zip(new_points, mean_stack):
+                self.mean_sources_cache[tuple(float(ele) for ele in point)] = mean_point
+
+        diffGP.Y = [y - self.compute_mean_sources(point) for point, y in zip(self.X, self.Y)]
+        diffGP.X = copy.deepcopy(self.X)
+        self.diffGP = diffGP
+
+        return 0
+
+    def append_observation(self, current_point, response):
+        "add one target point to both target data and diffGP, update cached factors by one row"
+        super(StackedShapeTransferBO, self).append_observation(current_point, response)
+
+        diff_y_point = response - self.compute_mean_sources(current_point)
+        self.diffGP.append_observation(current_point, diff_y_point)
+
+        return 0
+
+    def compute_mean(self, current_point):
+        "compute the mean value of source layers + diffGP at current_point"
+        mean_sources = sum(sourceGP.compute_mean(current_point) for sourceGP in self.source_gps)
+        mean_current = mean_sources + self.diffGP.compute_mean(current_point)
+
+        return mean_current
+
+    def compute_grad_mean(self, current_point):
+        "compute the gradient of mean(x) in source layers + diffGP at current_point"
+        grad_mean = self.diffGP.compute_grad_mean(current_point)
+        for sourceGP in self.source_gps:
+            grad_mean = grad_mean + sourceGP.compute_grad_mean(current_point)
+
+        return grad_mean
+
+    def compute_mle_sigma2(self):
+        """
+        compute the MLE of sigma^2 in source layers + diffGP
+        Note: source layers are simply treated as constant functions without randomness
+        """
+        return self.diffGP.compute_mle_sigma2()
+
+    def compute_sigma2(self):
+        "return sigma^2 of diffGP, source layers are simply treated as constant functions without randomness"
+        return self.diffGP.compute_sigma2()
+
+    def compute_s2(self, current_point):
+        "compute the s^2(x) of diffGP at current_point"
+        return self.diffGP.compute_s2(current_point)
+
+    def compute_var(self, current_point, zeroCheck=1e-13):
+        "compute the variance value of source layers + diffGP at current_point, which is the one of diffGP"
+        return self.diffGP.compute_var(current_point, zeroCheck)
+
+    def compute_grad_var(self, current_point, zeroCheck=1e-13):
+        "compute the gradient of var(x) in source layers + diffGP at current_point"
+        return self.diffGP.compute_grad_var(current_point, zeroCheck)
+
+    def predict_batch(self, points, return_grad=False, zeroCheck=1e-13):
+        """
+        compute mean & variance (and their gradients) of source layers + diffGP at all rows of points (m*d)
+        Note: source layers are simply treated as constant functions without randomness
+        """
+        mean_sources, grad_mean_sources = self.predict_sources_batch(points, return_grad, zeroCheck)
+        pred_diffGP = self.diffGP.predict_batch(points, return_grad, zeroCheck)
+
+        mean = mean_sources + pred_diffGP[0]
+        var = pred_diffGP[1]
+
+        if not return_grad:
+            return mean, var
+
+        grad_mean = grad_mean_sources + pred_diffGP[2]
+        grad_var = pred_diffGP[3]
+
+        return mean, var, grad_mean, grad_var
+
+
 class BiasCorrectedBO(ExpectedImprovement, UpperConfidenceBound):
     """
     class BiasCorrectedBO: 
@@ -501,12 +992,14 @@ class BiasCorrectedBO(ExpectedImprovement, UpperConfidenceBound):
         super(BiasCorrectedBO, self).__init__()
         self.zeroGP1 = None
         self.diffGP = None
+        self.X_task2 = []
+        self.Y_task2 = []
 
-    def build_task1_gp(self, file_exp_task1, theta_task1=1.0):
-        "build ZeroGProcess for task1 with known experiment points"
+    def build_task1_gp(self, file_exp_task1, theta_task1=1.0, cache_dir=None):
+        "build ZeroGProcess for task1 with known experiment points, load / save the fitted GP in cache_dir if not None"
         zeroGP1 = ZeroGProcess()
-        zeroGP1.get_data_from_file(file_exp_task1)
         zeroGP1.theta = theta_task1
+        zeroGP1.get_data_from_file_cached(file_exp_task1, cache_dir)
         assert(len(zeroGP1.X) == len(zeroGP1.Y))
 
         self.zeroGP1 = zeroGP1
@@ -523,6 +1016,10 @@ class BiasCorrectedBO(ExpectedImprovement, UpperConfidenceBound):
         X_task2 = self.X
         Y_task2 = self.Y
 
+        # keep task2 data only, bias corrected task1 points are appended to self.X / self.Y below
+        self.X_task2 = copy.deepcopy(X_task2)
+        self.Y_task2 = copy.deepcopy(Y_task2)
+
         diff_Y = []
 
         for point, y_task2 in zip(X_task2, Y_task2):
@@ -540,14 +1037,36 @@ class BiasCorrectedBO(ExpectedImprovement, UpperConfidenceBound):
 
         assert(len(X1) == len(Y1))
 
-        # only add points from X1, which are not in exp 2
+        # only add points from X1, which are not in exp 2 (nor repeated in X1), looked up by hashed coordinates
+        seen_points = set(tuple(float(ele) for ele in point) for point in self.X)
+        add_index = []
         for i in range(len(X1)):
-            if X1[i] not in self.X:
-                self.Y.append(Y1[i] + diffGP.compute_mean(X1[i]))
+            key = tuple(float(ele) for ele in X1[i])
+            if key not in seen_points:
+                seen_points.add(key)
+                add_index.append(i)
+
+        if len(add_index) > 0:
+            mean_diffGP, _ = diffGP.predict_batch([X1[i] for i in add_index])
+
+            for i, mean_diffGP_i in zip(add_index, mean_diffGP):
+                self.Y.append(Y1[i] + mean_diffGP_i)
                 self.X.append(X1[i])
         
         return 0
 
+    def append_observation(self, current_point, response):
+        """
+        add one task2 point, all bias corrected task1 points depend on diffGP,
+        so diffGP and the corrected data are rebuilt from task2 data
+        """
+        self.X = self.X_task2 + [list(current_point)]
+        self.Y = self.Y_task2 + [response]
+        self.num_points = len(self.X)
+        self.build_diff_gp()
+
+        return 0
+
     def plot_ei(self, num_points=100, exp_ratio=1, confidence=0.9, kessis=[0.0], highlight_point=None):
         "plot the acquisition function as well as ZeroGP&STBO in a figure with two figs"
         min_point_exp1 = min(self.zeroGP1.X)[0]
@@ -564,22 +1083,16 @@ class BiasCorrectedBO(ExpectedImprovement, UpperConfidenceBound):
 
         # subplot 1: GProcess means & confidence bands of zeroGP1 (on data 1) and diffGP (on task2 - mean1)
         GP1 = self.zeroGP1
-        y1_mean = [GP1.compute_mean([ele]) for ele in x_draw]
-        y1_conf_int = [GP1.conf_interval([ele]) for ele in x_draw]
-        y1_lower = [ele[0] for ele in y1_conf_int]
-        y1_upper = [ele[1] for ele in y1_conf_int]
+        y1_mean, _ = GP1.predict_batch(x_draw[:, None])
+        y1_lower, y1_upper = GP1.conf_interval_batch(x_draw[:, None])
 
         diffGP = self.diffGP
-        yDiff_mean = [diffGP.compute_mean([ele]) for ele in x_draw]
-        yDiff_conf_int = [diffGP.conf_interval([ele]) for ele in x_draw]
-        yDiff_lower = [ele[0] for ele in yDiff_conf_int]
-        yDiff_upper = [ele[1] for ele in yDiff_conf_int]
+        yDiff_mean, _ = diffGP.predict_batch(x_draw[:, None])
+        yDiff_lower, yDiff_upper = diffGP.conf_interval_batch(x_draw[:, None])
 
         # subplot 2: GProcess means & confidence bands of Bias Corrected Bayeisan Optimization
-        y_mean = [self.compute_mean([ele]) for ele in x_draw]
-        y_conf_int = [self.conf_interval([ele], confidence) for ele in x_draw]
-        y_lower = [ele[0] for ele in y_conf_int]
-        y_upper = [ele[1] for ele in y_conf_int]
+        y_mean, _ = self.predict_batch(x_draw[:, None])
+        y_lower, y_upper = self.conf_interval_batch(x_draw[:, None], confidence)
 
         # subplot 3: EI AC function with multiple parameters 
         ac_values_lst = []
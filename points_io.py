@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+read & write files of experiment points (response and coordinates of each point)
+    TSV:    header line "response#dim1#dim2..." then one tab separated line per point
+    binary: magic + json header with column names, then float64 rows, used for files ending with BINARY_SUFFIX
+"""
+import os, json, argparse
+import numpy as np
+
+BINARY_SUFFIX = ".pts"
+BINARY_MAGIC = b"STBOPTS\x01"
+BINARY_VERSION = 1
+
+
+def is_binary(file):
+    "binary point files are recognized by their suffix"
+    return str(file).endswith(BINARY_SUFFIX)
+
+def default_columns(dim):
+    "column names used in the headers written by the simulations: response, dim1, ..., dim{dim}"
+    return ["response"] + ["dim"+str(i+1) for i in range(dim)]
+
+def write_binary_header(f_out, columns):
+    "write magic and json header, padded such that rows start at a multiple of 8 bytes"
+    header = json.dumps({"version": BINARY_VERSION, "columns": list(columns), "dtype": "<f8"}).encode("utf-8")
+    len_header = len(BINARY_MAGIC) + 4 + len(header)
+    header = header + b' ' * ((-len_header) % 8)
+
+    f_out.write(BINARY_MAGIC)
+    f_out.write(np.uint32(len(header)).tobytes())
+    f_out.write(header)
+
+    return 0
+
+def read_binary_header(f_in):
+    "return column names and offset of the first row"
+    magic = f_in.read(len(BINARY_MAGIC))
+    if magic != BINARY_MAGIC:
+        raise(TypeError)
+
+    len_header = int(np.frombuffer(f_in.read(4), dtype=np.uint32)[0])
+    header = json.loads(f_in.read(len_header).decode("utf-8"))
+    assert(header["version"] == BINARY_VERSION)
+
+    return header["columns"], len(BINARY_MAGIC) + 4 + len_header
+
+def parse_tsv_header(line):
+    "column names of a header line, e.g. 'response#dim1#dim2' => ['response', 'dim1', 'dim2']"
+    return [ele.strip() for ele in line.split('#')]
+
+def read_table(file, mmap=False):
+    """
+    read all points of file
+    return: column names (None if TSV file has no header), data (n*num_columns)
+    mmap: memory map the rows of a binary file instead of reading them
+    """
+    if is_binary(file):
+        with open(file, "rb") as f_in:
+            columns, offset = read_binary_header(f_in)
+
+        num_columns = len(columns)
+        num_rows = (os.path.getsize(file) - offset) // (8 * num_columns)   # ignore a partially written last row
+        if num_rows == 0:
+            return columns, np.zeros(shape=(0, num_columns))
+
+        if mmap:
+            data = np.memmap(file, dtype="<f8", mode="r", offset=offset, shape=(num_rows, num_columns))
+        else:
+            data = np.fromfile(file, dtype="<f8", count=num_rows*num_columns, offset=offset)
+            data = np.reshape(data, (num_rows, num_columns))
+
+        return columns, data
+
+    columns = None
+    lines = []
+    with open(file, "r", encoding="utf-8") as f_in:
+        for line in f_in:
+            if '#' in line:
+                columns = parse_tsv_header(line)
+            elif len(line.split()) > 0:
+                lines.append(line)
+
+    if len(lines) == 0:
+        return columns, np.zeros(shape=(0, 0 if columns == None else len(columns)))
+
+    data = np.array([[float(ele) for ele in line.split()] for line in lines], dtype=float)
+    assert(data.ndim == 2)                      # ensure all lines have same dim
+    if columns != None:
+        assert(data.shape[1] == len(columns))   # ensure all lines have same dim
+
+    return columns, data
+
+def read_points(file, response_col=None):
+    """
+    read responses (n,) and points (n*d) of file
+    response_col: column of response, taken from the header ("response") if None, 0 without header
+    """
+    columns, data = read_table(file)
+
+    if response_col == None:
+        response_col = columns.index("response") if (columns != None) and ("response" in columns) else 0
+
+    if data.shape[1] == 0:                      # empty file without header
+        return np.zeros(shape=(0,)), np.zeros(shape=(0, 0))
+
+    responses = data[:, response_col]
+    points = np.delete(data, response_col, axis=1)
+
+    return responses, points
+
+def get_col(file, header_name="response"):
+    "get column named header_name of file as list"
+    columns, data = read_table(file)
+    assert((columns != None) and (header_name in columns))
+
+    return data[:, columns.index(header_name)].tolist()
+
+def format_tsv_line(response, point):
+    "same text format as utils.write_exp_result"
+    return str(response) + '\t' + '\t'.join([str(ele) for ele in point]) + '\n'
+
+
+class PointWriter:
+    """
+    Class PointWriter: buffered appends of points (response, coordinates) to a TSV or binary file
+        with PointWriter(file) as writer:
+            writer.append(response, point)
+    the file is opened once at the first flush and kept open until close, flush() makes the points visible to readers
+    """
+    def __init__(self, file, columns=None, buffer_size=256):
+        self.file = file
+        self.columns = columns          # header of a new file, default_columns(dim) for binary files if None
+        self.buffer_size = buffer_size  # flush after so many points
+        self.buffer = []
+        self.f_out = None               # open file, None before the first flush and after close
+        self.num_columns = None         # number of columns of the binary file
+
+    def append(self, response, point):
+        "buffer one point, write buffered points if buffer is full"
+        self.buffer.append((response, list(point)))
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+        return 0
+
+    def open(self, num_columns):
+        "open the file for appending, write the header of a new file or check the header of an existing binary file"
+        is_new = (not os.path.isfile(self.file)) or (os.path.getsize(self.file) == 0)
+
+        if is_binary(self.file):
+            if is_new:
+                columns = self.columns if self.columns != None else default_columns(num_columns-1)
+                with open(self.file, "wb") as f_out:
+                    write_binary_header(f_out, columns)
+            else:
+                with open(self.file, "rb") as f_in:
+                    columns, _ = read_binary_header(f_in)
+            self.num_columns = len(columns)
+            self.f_out = open(self.file, "ab")
+        else:
+            self.f_out = open(self.file, 'a', encoding="utf-8")
+            if is_new and (self.columns != None):
+                self.f_out.writelines('#'.join(self.columns) + '\n')
+
+        return 0
+
+    def flush(self):
+        "write all buffered points to the open file and flush it"
+        if len(self.buffer) == 0:
+            return 0
+
+        if is_binary(self.file):
+            rows = np.array([[response] + point for response, point in self.buffer], dtype="<f8")
+            if self.f_out == None:
+                self.open(rows.shape[1])
+            assert(self.num_columns == rows.shape[1])
+            self.f_out.write(rows.tobytes())
+        else:
+            if self.f_out == None:
+                self.open(len(self.buffer[0][1])+1)
+            self.f_out.writelines([format_tsv_line(response, point) for response, point in self.buffer])
+
+        self.f_out.flush()
+        self.buffer = []
+
+        return 0
+
+    def close(self):
+        "write remaining buffered points and close the file"
+        self.flush()
+        if self.f_out != None:
+            self.f_out.close()
+            self.f_out = None
+
+        return 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def append_point(file, response, point):
+    "append one point to a TSV or binary file, opens the file for this point only (PointWriter for many points)"
+    with PointWriter(file, buffer_size=1) as writer:
+        writer.append(response, point)
+
+    return 0
+
+def write_table(file, columns, data):
+    "write all rows of data (n*num_columns) to a new TSV or binary file with header columns"
+    data = np.reshape(np.asarray(data, dtype=float), (-1, len(columns)))
+    if os.path.isfile(file):
+        os.remove(file)
+
+    with PointWriter(file, columns=columns, buffer_size=len(data)+1) as writer:
+        for row in data:
+            writer.append(row[0], row[1:].tolist())
+
+    if len(data) == 0:  # header only
+        if is_binary(file):
+            with open(file, "wb") as f_out:
+                write_binary_header(f_out, columns)
+        else:
+            with open(file, "w", encoding="utf-8") as f_out:
+                f_out.writelines('#'.join(columns) + '\n')
+
+    return 0
+
+def convert_points(file_in, file_out):
+    "convert a point file between TSV and binary format (by suffix of file_out)"
+    columns, data = read_table(file_in)
+    if columns == None:
+        columns = default_columns(data.shape[1]-1)
+
+    write_table(file_out, columns, data)
+
+    return 0
+
+def is_point_file(file):
+    "binary point files by suffix, TSV point files by their header 'response#...' in the first line"
+    if is_binary(file):
+        return True
+    if not str(file).endswith(".tsv"):
+        return False
+
+    with open(file, "r", encoding="utf-8", errors="replace") as f_in:
+        first_line = f_in.readline()
+
+    return ('#' in first_line) and (parse_tsv_header(first_line)[0] == "response")
+
+def convert_tree(root_dir, to_binary=True, remove=False):
+    """
+    convert all point files below root_dir to binary (to_binary) or TSV files next to them, same name with the other suffix
+    remove: delete each original file after its conversion
+    return: number of converted files, list of skipped point files which could not be parsed
+    """
+    suffix_in, suffix_out = (".tsv", BINARY_SUFFIX) if to_binary else (BINARY_SUFFIX, ".tsv")
+    num_converted = 0
+    skipped = []
+
+    for dir_path, _, file_names in os.walk(root_dir):
+        for file_name in sorted(file_names):
+            file_in = os.path.join(dir_path, file_name)
+            if (not file_name.endswith(suffix_in)) or (not is_point_file(file_in)):
+                continue
+
+            try:
+                convert_points(file_in, file_in[:-len(suffix_in)] + suffix_out)
+            except (ValueError, AssertionError, TypeError):
+                skipped.append(file_in)     # e.g. placeholder responses '_' of interactive runs
+                continue
+
+            if remove:
+                os.remove(file_in)
+            num_converted += 1
+
+    return num_converted, skipped
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="convert all point files of a dir tree (e.g. ./data) between TSV and binary " + BINARY_SUFFIX + " format")
+    argparser.add_argument("root_dir", help="root of the dir tree, e.g. ./data")
+    argparser.add_argument("--to", default="pts", choices=["pts", "tsv"], help="target format")
+    argparser.add_argument("--remove", action="store_true", help="delete original files after conversion, analysis then finds one file per method again")
+    parser = argparser.parse_args()
+
+    num_converted, skipped = convert_tree(parser.root_dir, to_binary=(parser.to == "pts"), remove=parser.remove)
+    print("converted " + str(num_converted) + " point files to " + parser.to + ", skipped " + str(len(skipped)))
+    for file in skipped:
+        print("skipped: " + file)
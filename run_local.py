@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+run the simulation grids of run_simulation.sh, run_simulation_sampling.sh and run_simulation_project.sh
+on the local machine: every repetition is one job, jobs run concurrently as separate processes
+    python run_local.py simulation 0 1 gp --num_jobs 32
+"""
+import argparse, os, sys, shlex, subprocess, time
+from concurrent.futures import ThreadPoolExecutor
+
+# scripts which take the additional arguments of --extra_args (--resume, --prescreen, --num_workers, ...),
+# main_sample_simulation.py has none of them
+EXTRA_ARGS_SCRIPTS = ["main_simulation.py"]
+
+# grid: {stage: (out subdir, job name prefix, num_rep, script, script arguments)}, same settings as the sbatch scripts
+GRIDS = {
+    "simulation": {
+        "path_data": "data",
+        "stages": {
+            1:  ("EXP_mu2_0.25_0.25_theta_1_sample", "EXP_mu2_0.25_0.25_theta_1", 20, "main_simulation.py",
+                 ["--T1", "20", "--T2", "20", "--type", "EXP", "--mu1", "0_0", "--mu2", "0.25_0.25", "--theta", "1"]),
+            2:  ("2D_branin_5sample_bad_prior_sampleMeanNeg50_1rF1Mean", "Branin", 2, "main_simulation.py",
+                 ["--T1", "20", "--T2", "20", "--type", "BR"]),
+            3:  ("Needle_shift_0.05", "Needle_shift_0.05", 20, "main_simulation.py",
+                 ["--T1", "40", "--T2", "20", "--type", "NEEDLE", "--needle_shift", "0.05"]),
+            4:  ("Mono2Needle_shift_0.1", "Mono2Needle_shift_0.1", 20, "main_simulation.py",
+                 ["--T1", "20", "--T2", "20", "--type", "MONO2NEEDLE", "--needle_shift", "0.1"]),
+            5:  ("Mono2Double_mu2_9_theta2_2", "Mono2Double_mu2_9", 20, "main_simulation.py",
+                 ["--T1", "20", "--T2", "20", "--type", "MONO2DOUBLE"]),
+            6:  ("Double2Double_5sample_no_prior_sampleMean1.0_1rF1Mean", "Double2Double_2close_prior", 20, "main_simulation.py",
+                 ["--T1", "20", "--T2", "20", "--type", "DOUBLE2DOUBLE"]),
+            7:  ("Triple2Double_5sample_no_prior_sampleMean1.0_1rF1Mean", "Triple2Double_2close_prior", 20, "main_simulation.py",
+                 ["--T1", "20", "--T2", "20", "--type", "TRIPLE2DOUBLE"]),
+            8:  ("Double2Triple", "Double2Triple", 20, "main_simulation.py",
+                 ["--T1", "20", "--T2", "20", "--type", "DOUBLE2TRIPLE"]),
+            9:  ("2D_Triple2Triple_5sample_2bad_prior_sampleMean0.5_1rF1Mean", "Triple2Triple_2D", 20, "main_simulation.py",
+                 ["--T1", "20", "--T2", "20", "--type", "TRIPLE2TRIPLE_2D"]),
+            10: ("2D_Double2Double_5sample_2bad_prior_sampleMean0.5_1rF1Mean", "Double2Double_2D", 20, "main_simulation.py",
+                 ["--T1", "20", "--T2", "20", "--type", "DOUBLE2DOUBLE_2D"]),
+            11: ("2D_ackley_5sample_no_prior_sampleMeanNeg25_1rF1Mean", "Ackley_2D", 2, "main_simulation.py",
+                 ["--T1", "20", "--T2", "20", "--type", "ACKLEY"]),
+            12: ("2D_bukin_5sample_bad_prior_sampleMeanNeg50_1rF1Mean", "Bukin_2D", 20, "main_simulation.py",
+                 ["--T1", "20", "--T2", "20", "--type", "BUKIN"]),
+            13: ("2D_bohach_5sample_bad_prior_sampleMeanNeg2500_1rF1Mean", "Bohach_2D", 2, "main_simulation.py",
+                 ["--T1", "20", "--T2", "20", "--type", "BOHACH"]),
+            14: ("2D_booth_5sample_no_prior_sampleMeanNeg700_1rF1Mean", "Booth_2D", 2, "main_simulation.py",
+                 ["--T1", "20", "--T2", "20", "--type", "BOOTH"]),
+            15: ("2D_griewank_5sample_bad_prior_sampleMeanNeg2_1rF1Mean", "Griewank_2D", 2, "main_simulation.py",
+                 ["--T1", "20", "--T2", "20", "--type", "GRIEWANK"]),
+            16: ("2D_schwefel_5sample_no_prior_sampleMeanNeg800_1rF1Mean", "Schwefel_2D", 20, "main_simulation.py",
+                 ["--T1", "20", "--T2", "20", "--type", "SCHWEFEL"]),
+            17: ("2D_rotateHyper_5sample_bad_prior_sampleMeanNeg1000_1rF1Mean", "RotateHyper_2D", 2, "main_simulation.py",
+                 ["--T1", "20", "--T2", "20", "--type", "ROTATE_HYPER"]),
+            18: ("2D_matyas_5sample_bad_prior_sampleMeanNeg0.5_1rF1Mean", "Matyas_2D", 2, "main_simulation.py",
+                 ["--T1", "20", "--T2", "20", "--type", "MATYAS"]),
+            19: ("2D_sixHump_5sample_no_prior_sampleMeanNeg0.5_1rF1Mean", "SixHump_2D", 20, "main_simulation.py",
+                 ["--T1", "20", "--T2", "20", "--type", "SIX_HUMP"]),
+            20: ("2D_forrester_5sample_far_prior_sampleMeanNeg0.5_1rF1Mean", "Forrester_2D", 20, "main_simulation.py",
+                 ["--T1", "20", "--T2", "20", "--type", "FORRESTER"]),
+        },
+    },
+    "sampling": {
+        "path_data": "data/sampling_experiments",
+        "stages": {
+            1: ("Dimension-1", "simulation_sampled_dim1", 100, "main_sample_simulation.py",
+                ["--dim", "1", "--T1", "20", "--T2", "20", "--num_task2", "2"]),
+            2: ("Dimension-2", "simulation_sampled_dim2", 100, "main_sample_simulation.py",
+                ["--dim", "2", "--T1", "40", "--T2", "40", "--num_task2", "2"]),
+        },
+    },
+    "project": {
+        "path_data": "data/project_experiments",
+        "stages": {
+            1: ("Dimension-10_20T1", "project_sampled", 100, "main_sample_simulation.py",
+                ["--dim", "10", "--T1", "17", "--T2", "10", "--num_task2", "1"]),
+        },
+    },
+}
+
+
+def arg_parser():
+    "parse the arguments"
+    argparser = argparse.ArgumentParser(description="run simulation grids on a local process pool instead of Slurm")
+    argparser.add_argument("grid", choices=list(GRIDS.keys()), help="grid of run_simulation.sh | run_simulation_sampling.sh | run_simulation_project.sh")
+    argparser.add_argument("stage", help="stage number as in the sbatch scripts, 0: all stages")
+    argparser.add_argument("from_task1", choices=['0', '1', '2'], help="0: skip task1 and run task 2; 1: run from task1; 2: run task1 only")
+    argparser.add_argument("task2_start_from", choices=["gp", "rand"], help="run task2 from gp or rand in task1")
+    argparser.add_argument("--path_data", default=None, help="root dir of outputs, default as in the sbatch scripts")
+    argparser.add_argument("--num_rep", default=None, help="number of repetitions of each stage, default as in the sbatch scripts")
+    argparser.add_argument("--num_jobs", default=str(os.cpu_count()), help="number of jobs running at the same time")
+    argparser.add_argument("--retries", default="1", help="number of reruns of a failed job")
+    argparser.add_argument("--threads_per_job", default="1", help="BLAS/OpenMP threads of each job, avoid oversubscription")
+    argparser.add_argument("--log_dir", default="./logs", help="dir of per-job logs and summary.tsv")
+    argparser.add_argument("--extra_args", default="", help="additional arguments passed to every main_simulation.py job (grid simulation), e.g. --extra_args='--prescreen sobol'")
+    argparser.add_argument("--dry_run", action="store_true", help="only print the jobs")
+
+    parser = argparser.parse_args()
+
+    return parser
+
+def expand_jobs(grid, stage, from_task1, task2_start_from, path_data=None, num_rep=None, extra_args=[]):
+    """
+    expand stage(s) of grid into jobs [(job_name, out_dir, command)], one job per repetition
+    extra_args: appended to the commands of EXTRA_ARGS_SCRIPTS, ValueError if a stage runs another script
+    """
+    grid_stages = GRIDS[grid]["stages"]
+    if path_data == None:
+        path_data = GRIDS[grid]["path_data"]
+
+    stages = sorted(grid_stages.keys()) if stage == 0 else [stage]
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    jobs = []
+    for stage_k in stages:
+        out_subdir, job_prefix, num_rep_k, script, script_args = grid_stages[stage_k]
+        if (len(extra_args) > 0) and (script not in EXTRA_ARGS_SCRIPTS):
+            raise(ValueError("--extra_args " + ' '.join(extra_args) + " is not supported by " + script + " of grid " + grid))
+
+        if num_rep != None:
+            num_rep_k = num_rep
+
+        for i in range(1, num_rep_k+1):
+            out_dir = os.path.join(path_data, out_subdir, str(i))
+            job_name = job_prefix + '_' + task2_start_from + '_' + str(i)
+            command = [sys.executable, os.path.join(script_dir, script)] + script_args + \
+                      ["--task2_start_from", task2_start_from, "--from_task1", from_task1, "--out_dir", out_dir] + extra_args
+            jobs.append((job_name, out_dir, command))
+
+    return jobs
+
+def run_job(job, log_dir, retries=1, threads_per_job=None):
+    "run one job in a subprocess, rerun up to retries times if it fails; return (job_name, status, attempts, seconds, log file)"
+    job_name, out_dir, command = job
+    os.makedirs(out_dir, exist_ok=True)
+    file_log = os.path.join(log_dir, job_name + ".log")
+
+    env = os.environ.copy()
+    if threads_per_job != None:
+        for var in ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"]:
+            env[var] = str(threads_per_job)
+
+    time_start = time.time()
+    with open(file_log, 'w', encoding="utf-8") as f_log:
+        for attempt in range(1, retries+2):
+            f_log.writelines("# attempt " + str(attempt) + ": " + ' '.join([shlex.quote(ele) for ele in command]) + '\n')
+            f_log.flush()
+            return_code = subprocess.call(command, stdout=f_log, stderr=subprocess.STDOUT, env=env)
+            f_log.writelines("# exit code " + str(return_code) + '\n')
+
+            if return_code == 0:
+                return job_name, "done", attempt, time.time() - time_start, file_log
+
+    return job_name, "failed", attempt, time.time() - time_start, file_log
+
+def run_jobs(jobs, log_dir, num_jobs, retries=1, threads_per_job=None):
+    "run all jobs with num_jobs jobs at the same time, each job is a process of its own"
+    os.makedirs(log_dir, exist_ok=True)
+
+    results = []
+    with ThreadPoolExecutor(max_workers=num_jobs) as pool:
+        futures = [pool.submit(run_job, job, log_dir, retries, threads_per_job) for job in jobs]
+        for future in futures:
+            result = future.result()
+            results.append(result)
+            print("{}\t{}\t{} attempt(s)\t{:.1f}s".format(*result[:4]), flush=True)
+
+    return results
+
+def write_summary(results, file_summary):
+    "write the summary table of all jobs and print the counts"
+    with open(file_summary, 'w', encoding="utf-8") as f_out:
+        f_out.writelines("job_name\tstatus\tattempts\tseconds\tlog\n")
+        for job_name, status, attempts, seconds, file_log in results:
+            f_out.writelines(job_name + '\t' + status + '\t' + str(attempts) + '\t' + "{:.1f}".format(seconds) + '\t' + file_log + '\n')
+
+    num_failed = len([result for result in results if result[1] != "done"])
+    print("Finished {} jobs: {} done, {} failed, summary in {}".format(len(results), len(results)-num_failed, num_failed, file_summary))
+
+    return num_failed
+
+
+if __name__ == "__main__":
+    parser = arg_parser()
+
+    num_rep = None if parser.num_rep == None else int(parser.num_rep)
+    try:
+        jobs = expand_jobs(parser.grid, int(parser.stage), parser.from_task1, parser.task2_start_from,
+                           parser.path_data, num_rep, shlex.split(parser.extra_args))
+    except ValueError as error:
+        sys.exit(str(error))     # reject before any job starts, instead of failing (and retrying) every job
+
+    if parser.dry_run:
+        for job_name, out_dir, command in jobs:
+            print(job_name + '\t' + ' '.join([shlex.quote(ele) for ele in command]))
+        sys.exit(0)
+
+    results = run_jobs(jobs, parser.log_dir, int(parser.num_jobs), int(parser.retries), int(parser.threads_per_job))
+    num_failed = write_summary(results, os.path.join(parser.log_dir, "summary.tsv"))
+
+    sys.exit(1 if num_failed > 0 else 0)
@@ -4,76 +4,106 @@ import matplotlib.pyplot as plt
 from matplotlib import cm
 from mpl_toolkits.mplot3d import axes3d
 from optimization import ExpectedImprovement
+from utils import gram_mat
 
 
+# all functions take a point (d,) and return a value, or take points (n*d) and return values (n,)
+def as_points(input):
+    "point (d,) or points (n*d) as float array, coordinates are along the last axis"
+    return np.asarray(input, dtype=float)
+
+def power(x, exponent):
+    "x**exponent by pow() on every element: x**2 on arrays is x*x, which can differ from pow() of a single point in the last bit"
+    return np.float_power(x, exponent)
+
+def grid(fun, x_low, x_up, y_low, y_up, step=0.25, **kwargs):
+    """
+    evaluate fun on a 2D mesh grid with one call on all grid points, used by plotting
+    return: X, Y, Z of shape (num_y, num_x) as np.meshgrid
+    """
+    X, Y = np.meshgrid(np.arange(x_low, x_up, step), np.arange(y_low, y_up, step))
+    points = np.stack([X.ravel(), Y.ravel()], axis=1)
+    Z = np.reshape(fun(points, **kwargs), X.shape)
+
+    return X, Y, Z
+
 # benchmark functions
 def ackley(pnt_2d):  # 1
-    x = pnt_2d[0]
-    y = pnt_2d[1]
+    pnt_2d = as_points(pnt_2d)
+    x = pnt_2d[..., 0]
+    y = pnt_2d[..., 1]
 
-    fx = -20.0 * np.exp(-0.2*np.sqrt(0.5*(x**2 + y**2)))-np.exp(0.5*(np.cos(2*np.pi*x)+np.cos(2*np.pi*y))) + np.e + 20
+    fx = -20.0 * np.exp(-0.2*np.sqrt(0.5*(power(x, 2) + power(y, 2))))-np.exp(0.5*(np.cos(2*np.pi*x)+np.cos(2*np.pi*y))) + np.e + 20
     return -1*fx
 
 def bukin(pnt_2d):   # 2 
-    x = pnt_2d[0]
-    y = pnt_2d[1]
+    pnt_2d = as_points(pnt_2d)
+    x = pnt_2d[..., 0]
+    y = pnt_2d[..., 1]
 
-    fx = 100 * np.sqrt(np.abs(y - 0.01*(x**2) + 0.01*np.abs(x + 10)))
+    fx = 100 * np.sqrt(np.abs(y - 0.01*power(x, 2) + 0.01*np.abs(x + 10)))
     return -1*fx
 
 def booth(pnt_2d):   # 24
-    x = pnt_2d[0]
-    y = pnt_2d[1]
+    pnt_2d = as_points(pnt_2d)
+    x = pnt_2d[..., 0]
+    y = pnt_2d[..., 1]
 
-    fx = (x + 2*y - 7)**2 + (2*x + y -5)**2
+    fx = power(x + 2*y - 7, 2) + power(2*x + y -5, 2)
     return -1*fx
 
 def griewank(pnt_2d):  #7 [-5, 5]
-    x = pnt_2d[0]
-    y = pnt_2d[1]
+    pnt_2d = as_points(pnt_2d)
+    x = pnt_2d[..., 0]
+    y = pnt_2d[..., 1]
 
-    fx = x**2/4000 + y**2/4000 - np.cos(x)*np.cos(y/np.sqrt(2)) + 1
+    fx = power(x, 2)/4000 + power(y, 2)/4000 - np.cos(x)*np.cos(y/np.sqrt(2)) + 1
     return -1*fx
 
 def schwefel(pnt_2d):  #15 [-50, 50]
-    x = pnt_2d[0]*10
-    y = pnt_2d[1]*10
+    pnt_2d = as_points(pnt_2d)
+    x = pnt_2d[..., 0]*10
+    y = pnt_2d[..., 1]*10
 
     fx = 418.9829*2 - x*np.sin(np.sqrt(np.abs(x))) - y*np.sin(np.sqrt(np.abs(x)))
     return -1*fx    
 
 def bohachevsky(pnt_2d): # 17  []
-    x = pnt_2d[0]
-    y = pnt_2d[1]
+    pnt_2d = as_points(pnt_2d)
+    x = pnt_2d[..., 0]
+    y = pnt_2d[..., 1]
 
-    fx = x**2 + 2*(y**2) - 0.3*np.cos(3*np.pi*x) - 0.4*np.cos(4*np.pi*y) + 0.7
+    fx = power(x, 2) + 2*power(y, 2) - 0.3*np.cos(3*np.pi*x) - 0.4*np.cos(4*np.pi*y) + 0.7
     return -1*fx
 
 def rotate_hyper(pnt_2d):  # 19 [-50, 50]
-    x = pnt_2d[0]
-    y = pnt_2d[1]
+    pnt_2d = as_points(pnt_2d)
+    x = pnt_2d[..., 0]
+    y = pnt_2d[..., 1]
 
-    fx = x**2 + x**2 + y**2 
+    fx = power(x, 2) + power(x, 2) + power(y, 2) 
     return -1*fx 
 
 def matyas(pnt_2d): # 25 [-10, 10]
-    x = pnt_2d[0]
-    y = pnt_2d[1]
+    pnt_2d = as_points(pnt_2d)
+    x = pnt_2d[..., 0]
+    y = pnt_2d[..., 1]
 
-    fx = 0.26*(x**2 + y**2) - 0.48*x*y
+    fx = 0.26*(power(x, 2) + power(y, 2)) - 0.48*x*y
     return -1*fx
 
 def six_hump(pnt_2d): # 30 [-3, 3]
-    x = pnt_2d[0]
-    y = pnt_2d[1]
+    pnt_2d = as_points(pnt_2d)
+    x = pnt_2d[..., 0]
+    y = pnt_2d[..., 1]
 
-    fx = (4 - 2.1*(x**2) + (x**4)/3)*(x**2) + x*y + (-4 + 4*(y**2))*(y**2)
+    fx = (4 - 2.1*power(x, 2) + power(x, 4)/3)*power(x, 2) + x*y + (-4 + 4*power(y, 2))*power(y, 2)
     return -1*fx 
 
 def forrester(pnt_1d): # 39 [0, 1]
-    x = pnt_1d[0]
+    x = as_points(pnt_1d)[..., 0]
 
-    fx = np.sin(12*x -4)*((6*x - 2)**2)
+    fx = np.sin(12*x -4)*power(6*x - 2, 2)
     return -1*fx 
 
 def exp_mu(input, mu, theta=1):
@@ -81,9 +111,13 @@ def exp_mu(input, mu, theta=1):
     Exponential function on ||input - mu||^2,
     mu and x are lists with same length
     """
-    assert(len(input) == len(mu))
-    square_mu_input = [(xi - mu_i)**2 for xi, mu_i in zip(input, mu)]
-    norm2 = sum(square_mu_input)
+    input = as_points(input)
+    assert(input.shape[-1] == len(mu))
+
+    # add squares dim by dim, same order of additions as sum() over the list of squares
+    norm2 = 0
+    for i, mu_i in enumerate(mu):
+        norm2 = norm2 + power(input[..., i] - mu_i, 2)
 
     exp_mu = np.exp(-0.5 * norm2 / theta**2)
 
@@ -91,12 +125,10 @@ def exp_mu(input, mu, theta=1):
 
 def rkhs_norm(lst_coeff, lst_mu, theta=1):
     """
-    compute the RKHS norm  
+    compute the RKHS norm of sum_a coeff_a * exp_mu(, mu_a): sqrt(c^T K c) with Gram matrix K of lst_mu
     """
-    cross_part = 0
-    for ind_a, coeff_a in enumerate(lst_coeff):
-        for ind_b, coeff_b in enumerate(lst_coeff):
-            cross_part += coeff_a * coeff_b * exp_mu(lst_mu[ind_a], lst_mu[ind_b], theta=theta)
+    coeff = np.asarray(lst_coeff, dtype=float)
+    cross_part = coeff @ gram_mat(lst_mu, theta) @ coeff
     
     norm = np.sqrt(cross_part)
 
@@ -168,22 +200,24 @@ def plot_rkhs_norm(low_diff=0, up_diff=7, theta_lst=[0.25, 0.5, 1, 1.5, 3]):
 
 def branin(input=[3., 4.]):
     "Branin function: "
-    assert(len(input) == 2)
-    x1 = input[0]
-    x2 = input[1] 
-    branin1 = x2 - 5.1*(x1**2) / (4*np.pi**2) + 5*x1 / np.pi - 6
+    input = as_points(input)
+    assert(input.shape[-1] == 2)
+    x1 = input[..., 0]
+    x2 = input[..., 1] 
+    branin1 = x2 - 5.1*power(x1, 2) / (4*np.pi**2) + 5*x1 / np.pi - 6
     branin2 = 10*(1 - 1/(8*np.pi))*np.cos(x1)
-    branin = branin1**2 + branin2 + 10
+    branin = power(branin1, 2) + branin2 + 10
 
     return -1*branin
 
 def mod_branin(input=[3., 4.], shift=[5, 5]):
     "Modified Branin function: branin(x1, x2) + 20*x1 - 30*x2"
-    assert(len(input) == 2)
-    x1 = input[0] - shift[0]
-    x2 = input[1] - shift[1]
+    input = as_points(input)
+    assert(input.shape[-1] == 2)
+    x1 = input[..., 0] - shift[0]
+    x2 = input[..., 1] - shift[1]
 
-    input = [x1, x2]
+    input = np.stack([x1, x2], axis=-1)
     #mod_bran = branin(input) + 20*x1 - 30*x2
     mod_bran = branin(input) + 1000*exp_mu(input, mu=[5, 5], theta=1) + 50
     
@@ -196,26 +230,9 @@ def show_branin(shift=[5,5], mu=[5, 5], theta=1, x_low=-1, x_up=1, y_low=-1, y_u
 
     ax = fig.add_subplot(1, 2, 1, projection="3d")
 
-    X = np.arange(-10, 10, 0.25)
-    Y = np.arange(-10, 15, 0.25)
-    X, Y = np.meshgrid(X, Y)
-
-    branin1 = Y - 5.1*(X**2) / (4*np.pi**2) + 5*X / np.pi - 6
-    branin2 = 10*(1 - 1/(8*np.pi))*np.cos(X)
-    branin = branin1**2 + branin2 + 30
-
-    Z_branin = branin
-
-    branin1_shift = (Y-shift[1]) - 5.1*((X-shift[0])**2) / (4*np.pi**2) + 5*(X-shift[0]) / np.pi - 6
-    branin2_shift = 10*(1 - 1/(8*np.pi))*np.cos(X-shift[0])
-    branin_shift = branin1_shift**2 + branin2_shift + 30
-
-    Z_branin = branin    
-
-    exp1_norm2 = (X- mu[0])**2 + (Y - mu[1])**2
-
-    exp1 = np.exp(-0.5 * exp1_norm2 / theta**2)
-    Z_modify = branin_shift + 1000*exp1 + 50
+    # branin surface lifted by 20, and the shifted one plus exp bump at mu
+    X, Y, Z_branin = grid(lambda points: 20 - branin(points), -10, 10, -10, 15)
+    X, Y, Z_modify = grid(lambda points: 20 - branin(points - np.array(shift)) + 1000*exp_mu(points, mu, theta) + 50, -10, 10, -10, 15)
 
     surf_branin = ax.plot_surface(X, Y, Z_branin, rstride=1, cstride=1, cmap=cm.coolwarm,
                            linewidth=0, antialiased=False)
@@ -240,41 +257,43 @@ def show_branin(shift=[5,5], mu=[5, 5], theta=1, x_low=-1, x_up=1, y_low=-1, y_u
 
 def mono_func(input=[1.0]):
     """"Mono function"""
-    x = input[0]
+    x = as_points(input)[..., 0]
  
-    if x <= 2:
-        return 0.5*np.exp(x) + np.sin(4) + 2*np.log(2) - 2*np.log(2.5) - np.sin(5)
-    elif x>2 and x<= 5:
-        return np.sin(2*x) + 2*np.log(x) + 0.5*np.exp(2) - 2*np.log(2.5) - np.sin(5)
-    else:
+    # every piece on all points, then pick the piece of each point
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        value_low = 0.5*np.exp(x) + np.sin(4) + 2*np.log(2) - 2*np.log(2.5) - np.sin(5)
+        value_mid = np.sin(2*x) + 2*np.log(x) + 0.5*np.exp(2) - 2*np.log(2.5) - np.sin(5)
         v_5 = np.sin(2*5) + 2*np.log(5) + 0.5*np.exp(2) - 2*np.log(2.5) - np.sin(5)
-        value = np.exp(-x+5) - 1 + v_5
+        value_high = np.exp(-x+5) - 1 + v_5
+
+    value = np.select([x <= 2, (x > 2) & (x <= 5)], [value_low, value_mid], default=value_high)
 
-        return value
+    return value[()]
 
 def needle_func(input=[1.0], shift=0):
     "Needle function"
-    x = input[0] - shift
-    if x <= 2:
-        return 0.5*np.exp(x)
-    elif x>2 and x<= 2.5:
-        return -100*(x - 2.25)**2 + 6.25 + 0.5*np.exp(2)
-    elif x>2.5 and x <= 5:
-        return np.sin(2*x) + 2*np.log(x) + 0.5*np.exp(2) - 2*np.log(2.5) - np.sin(5)
-    else:
+    x = as_points(input)[..., 0] - shift
+
+    # every piece on all points, then pick the piece of each point
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        value_low = 0.5*np.exp(x)
+        value_needle = -100*power(x - 2.25, 2) + 6.25 + 0.5*np.exp(2)
+        value_mid = np.sin(2*x) + 2*np.log(x) + 0.5*np.exp(2) - 2*np.log(2.5) - np.sin(5)
         v_5 = np.sin(2*5) + 2*np.log(5) + 0.5*np.exp(2) - 2*np.log(2.5) - np.sin(5)
-        value = np.exp(-x+5) - 1 + v_5 
-        
-        return value
+        value_high = np.exp(-x+5) - 1 + v_5 
+
+    value = np.select([x <= 2, (x > 2) & (x <= 2.5), (x > 2.5) & (x <= 5)], [value_low, value_needle, value_mid], default=value_high)
+
+    return value[()]
 
 def show_needle(x_low, x_high, shift=0):
     "plot needle function above"
     x_draw = np.linspace(x_low, x_high, 100)
 
-    y1 = [0.2*needle_func([ele]) for ele in x_draw]
-    #y2 = [needle_func([ele], shift) for ele in x_draw]
+    y1 = 0.2*needle_func(x_draw[:, None])
+    #y2 = needle_func(x_draw[:, None], shift)
     
-    #diff_y2_y1 = [ele2 - ele1 for ele1, ele2 in zip(y1, y2)]
+    #diff_y2_y1 = y2 - y1
 
     fig, ax = plt.subplots(1, 1)
     #ax.set_title("Needle functions shift="+str(shift))
@@ -292,10 +311,10 @@ def show_mono2needle(x_low, x_high, shift=0):
     "plot mono func to needle func above"
     x_draw = np.linspace(x_low, x_high, 100)
 
-    y1 = [mono_func([ele]) for ele in x_draw]
-    y2 = [needle_func([ele], shift) for ele in x_draw]
+    y1 = mono_func(x_draw[:, None])
+    y2 = needle_func(x_draw[:, None], shift)
     
-    diff_y2_y1 = [ele2 - ele1 for ele1, ele2 in zip(y1, y2)]
+    diff_y2_y1 = y2 - y1
 
     fig, ax = plt.subplots(1, 1)
     ax.set_title("Mono to Needle (shift="+str(shift)+")")
@@ -314,8 +333,9 @@ def two_exp_mu(input, lambda1, lambda2, mu1, mu2, theta1=1, theta2=2):
     Exponential function on ||input - mu||^2,
     mu and x are lists with same length
     """
-    assert(len(input) == len(mu1))
-    assert(len(input) == len(mu2))
+    input = as_points(input)
+    assert(input.shape[-1] == len(mu1))
+    assert(input.shape[-1] == len(mu2))
 
     add_exp_mu = lambda1*exp_mu(input, mu1, theta1) + lambda2*exp_mu(input, mu2, theta2)
 
@@ -323,9 +343,10 @@ def two_exp_mu(input, lambda1, lambda2, mu1, mu2, theta1=1, theta2=2):
 
 def tri_exp_mu(input, lambda1, lambda2, lambda3, mu1, mu2, mu3, theta1=1, theta2=2, theta3=3):  
     "addition of triple exponential function"
-    assert(len(input) == len(mu1))
-    assert(len(input) == len(mu2))
-    assert(len(input) == len(mu3))
+    input = as_points(input)
+    assert(input.shape[-1] == len(mu1))
+    assert(input.shape[-1] == len(mu2))
+    assert(input.shape[-1] == len(mu3))
 
     add_exp_mu = lambda1*exp_mu(input, mu1, theta1) + lambda2*exp_mu(input, mu2, theta2) + lambda3*exp_mu(input, mu3, theta3)
 
@@ -335,10 +356,10 @@ def show_mono2double_exp_mu(lambda2, mu1, mu2, theta1, theta2, x_low, x_high):
     "plot: one exp to two exp transfering, where lambda1 = 1"
     x_draw = np.linspace(x_low, x_high, 100)
 
-    y1 = [exp_mu([ele], mu1, theta1) for ele in x_draw]
-    y2 = [two_exp_mu([ele], 1, lambda2, mu1, mu2, theta1, theta2) for ele in x_draw]
+    y1 = exp_mu(x_draw[:, None], mu1, theta1)
+    y2 = two_exp_mu(x_draw[:, None], 1, lambda2, mu1, mu2, theta1, theta2)
 
-    diff_y2_y1 = [ele2 - ele1 for ele1, ele2 in zip(y1, y2)]
+    diff_y2_y1 = y2 - y1
 
     fig, ax = plt.subplots(1, 1)
     ax.set_title("")
@@ -355,8 +376,8 @@ def show_two_exp_mu(lambda1, lambda2, mu1, mu2, theta1, theta2, x_low, x_high):
     "plot exp func to two exp func"
     x_draw = np.linspace(x_low, x_high, 100)
 
-    y1 = [two_exp_mu([ele], lambda1, lambda2, mu1, mu2, theta1, theta2) for ele in x_draw]
-    y2 = [two_exp_mu([ele], lambda2, lambda1, mu1, mu2, theta1, theta2) for ele in x_draw]
+    y1 = two_exp_mu(x_draw[:, None], lambda1, lambda2, mu1, mu2, theta1, theta2)
+    y2 = two_exp_mu(x_draw[:, None], lambda2, lambda1, mu1, mu2, theta1, theta2)
     
     fig, ax = plt.subplots(1, 1)
     ax.set_title("")
@@ -391,12 +412,12 @@ def show_double2triple_exp_mu(lambda1, lambda2, lambda3, mu1, mu2, mu3, theta1,
     print(EI2.compute_mean([0.5]))
     y1_mean = [EI2.compute_mean([ele]) for ele in x_draw]
 
-    y1 = [tri_exp_mu([ele], lambda1, lambda2, lambda3, mu1, mu2, mu3, theta1, theta2, theta3) for ele in x_draw]
+    y1 = tri_exp_mu(x_draw[:, None], lambda1, lambda2, lambda3, mu1, mu2, mu3, theta1, theta2, theta3)
 
     lambda1_t2 = 1; lambda2_t2 = 1.4; lambda3_t2 = 1.9
     mu1_t2 = [0]; mu2_t2 = [5]; mu3_t2 = [10]
     
-    y2 = [tri_exp_mu([ele], lambda1_t2, lambda2_t2, lambda3_t2, mu1_t2, mu2_t2, mu3_t2, theta1, theta2, theta3) for ele in x_draw]
+    y2 = tri_exp_mu(x_draw[:, None], lambda1_t2, lambda2_t2, lambda3_t2, mu1_t2, mu2_t2, mu3_t2, theta1, theta2, theta3)
     diff_y2_y1_mean = [ele2 - ele1 for ele1, ele2 in zip(y1_mean, y2)]
 
     fig, ax = plt.subplots(1, 1)
@@ -419,14 +440,14 @@ def show_triple2double_exp_mu(lambda1, lambda2, lambda3, mu1, mu2, mu3, theta1,
     "plot exp func to two exp func"
     x_draw = np.linspace(x_low, x_high, 100)
 
-    y1 = [tri_exp_mu([ele], lambda1, lambda2, lambda3, mu1, mu2, mu3, theta1, theta2, theta3) for ele in x_draw]
+    y1 = tri_exp_mu(x_draw[:, None], lambda1, lambda2, lambda3, mu1, mu2, mu3, theta1, theta2, theta3)
     
     lambda1_t2 = lambda2+0.2; lambda2_t2 = 0; lambda3_t2 = lambda1 - 0.2
     mu1_t2 = [mu1[0] + 0.2]; mu2_t2 = mu2; mu3_t2 = [mu3[0] - 0.2]
     
-    y2 = [tri_exp_mu([ele], lambda1_t2, lambda2_t2, lambda3_t2, mu1_t2, mu2_t2, mu3_t2, theta1, theta2, theta3) for ele in x_draw]
+    y2 = tri_exp_mu(x_draw[:, None], lambda1_t2, lambda2_t2, lambda3_t2, mu1_t2, mu2_t2, mu3_t2, theta1, theta2, theta3)
     
-    diff_y2_y1 = [ele2 - ele1 for ele1, ele2 in zip(y1, y2)]
+    diff_y2_y1 = y2 - y1
 
     fig, ax = plt.subplots(1, 1)
     ax.set_title("")
@@ -449,16 +470,8 @@ def show_3D_triple():
     mu1 = [0.5, 0.5]; mu2 = [5.5, 5.5]; mu3 = [9.5, 9.5]
     theta1 = theta2 = theta3 = 1
 
-    X = np.arange(-10, 10, 0.25)
-    Y = np.arange(-10, 15, 0.25)
-    X, Y = np.meshgrid(X, Y)
-
-    Z = np.zeros([len(X), len(Y[0])])
-    for i in range(len(X)):
-        for j in range(len(Y[0])):
-            x = X[i,j]
-            y = Y[i,j]
-            Z[i, j] = tri_exp_mu([x, y], lambda1, lambda2, lambda3, mu1, mu2, mu3, theta1, theta2, theta3)
+    X, Y, Z = grid(tri_exp_mu, -10, 10, -10, 15, lambda1=lambda1, lambda2=lambda2, lambda3=lambda3, mu1=mu1, mu2=mu2, mu3=mu3, 
+                   theta1=theta1, theta2=theta2, theta3=theta3)
 
     ax = fig.add_subplot(1, 1, 1, projection='3d')
     ax.plot_wireframe(X, Y, Z, rstride=5, cstride=5)
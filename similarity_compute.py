@@ -3,13 +3,14 @@
 import argparse, os, sys, logging
 import numpy as np
 import random
+from concurrent.futures import ProcessPoolExecutor
 
 sys.path.append(os.getcwd())
 
 from gp import ZeroGProcess
 
 from simfun import exp_mu, branin, mod_branin, needle_func, mono_func, two_exp_mu, tri_exp_mu
-from utils import write_exp_result, get_all_points, rkhs_norm, get_best_point, find_max_points, get_params_target
+from utils import write_exp_result, get_all_points, gram_mat, get_best_point, find_max_points, get_params_target
 
 
 def evaluate_target_from_source(num_exp, num_sample=20, sampling_exp=False):
@@ -255,34 +256,59 @@ def compute_similarity(file_source, file_target):
     lst_coeff_diff = lst_coeff_target + [-1*ele for ele in lst_coeff_source]
     lst_mu_diff = lst_mu_target + lst_mu_source
 
-    norm_f_source = rkhs_norm(lst_coeff_source, lst_mu_source)
-    norm_f_target = rkhs_norm(lst_coeff_target, lst_mu_target)
-    norm_f_diff = rkhs_norm(lst_coeff_diff, lst_mu_diff)
+    # one Gram matrix of target & source centers, its diagonal blocks belong to target and source
+    gram_diff = gram_mat(lst_mu_diff)
+    num_target = len(lst_coeff_target)
+    coeff_diff = np.array(lst_coeff_diff, dtype=float)
+    coeff_target = coeff_diff[:num_target]
+    coeff_source = -1*coeff_diff[num_target:]
+
+    norm_f_source = np.sqrt(coeff_source @ gram_diff[num_target:, num_target:] @ coeff_source)
+    norm_f_target = np.sqrt(coeff_target @ gram_diff[:num_target, :num_target] @ coeff_target)
+    norm_f_diff = np.sqrt(coeff_diff @ gram_diff @ coeff_diff)
 
     sim_t_s = norm_f_diff / norm_f_target
 
     return norm_f_source, norm_f_target, norm_f_diff, sim_t_s 
 
 
-def compute_similarity_batch(data_dir, file_source="simExp_points_task1_gp.tsv", file_target="simExp_points_task2_task1-gp.tsv", num_exp=20):
-    "compute similarity in batch"
+def compute_similarity_files(lst_file_source, lst_file_target, num_workers=1):
+    "compute_similarity on pairs of files, on a process pool with num_workers processes if num_workers > 1"
+    if num_workers > 1:
+        with ProcessPoolExecutor(max_workers=min(num_workers, len(lst_file_source))) as pool:
+            results = list(pool.map(compute_similarity, lst_file_source, lst_file_target))
+    else:
+        results = [compute_similarity(file_s, file_t) for file_s, file_t in zip(lst_file_source, lst_file_target)]
+
+    return results
+
+def compute_similarity_batch(data_dir, file_source="simExp_points_task1_gp.tsv", file_target="simExp_points_task2_task1-gp.tsv", num_exp=20, num_workers=1):
+    "compute similarity in batch, repetitions 1, ..., num_exp of data_dir on num_workers processes"
+    lst_sweep = compute_similarity_sweep([data_dir], file_source, file_target, num_exp, num_workers)
+
+    return lst_sweep[0]
+
+def compute_similarity_sweep(lst_data_dir, file_source="simExp_points_task1_gp.tsv", file_target="simExp_points_task2_task1-gp.tsv", num_exp=20, num_workers=1):
+    """
+    compute similarity of all repetitions of all data dirs (e.g. all mu values) in one pass over a process pool
+    return: [(lst_norm_source, lst_norm_target, lst_norm_diff, lst_sim_t_s) of each data dir]
+    """
+    lst_file_source = [data_dir + '/' + str(i+1) + '/' + file_source for data_dir in lst_data_dir for i in range(num_exp)]
+    lst_file_target = [data_dir + '/' + str(i+1) + '/' + file_target for data_dir in lst_data_dir for i in range(num_exp)]
 
-    lst_norm_source = []
-    lst_norm_target = []
-    lst_norm_diff = []
-    lst_sim_t_s = []
+    results = compute_similarity_files(lst_file_source, lst_file_target, num_workers)
 
-    for i in range(num_exp):
-        file_source_int = data_dir + '/' + str(i+1) + '/' + file_source 
-        file_target_int = data_dir + '/' + str(i+1) + '/' + file_target       
+    lst_sweep = []
+    for k in range(len(lst_data_dir)):
+        results_dir = results[k*num_exp:(k+1)*num_exp]
 
-        norm_f_source, norm_f_target, norm_f_diff, sim_t_s = compute_similarity(file_source_int, file_target_int)
-        lst_norm_source.append(norm_f_source)
-        lst_norm_target.append(norm_f_target)
-        lst_norm_diff.append(norm_f_diff)
-        lst_sim_t_s.append(sim_t_s)
+        lst_norm_source = [ele[0] for ele in results_dir]
+        lst_norm_target = [ele[1] for ele in results_dir]
+        lst_norm_diff = [ele[2] for ele in results_dir]
+        lst_sim_t_s = [ele[3] for ele in results_dir]
+        lst_sweep.append((lst_norm_source, lst_norm_target, lst_norm_diff, lst_sim_t_s))
 
-    return lst_norm_source, lst_norm_target, lst_norm_diff, lst_sim_t_s
+    return lst_sweep
 
 
 if __name__ == "__main__":
@@ -372,7 +398,7 @@ if __name__ == "__main__":
     # 2.1 1D sampling targets
     data_dir_1D_sampling = "data/sampling_experiments/Dimension-1"
     lst_norm_source_1D, lst_norm_target_1D, lst_norm_diff_1D, lst_sim_t_s_1D = compute_similarity_batch(data_dir_1D_sampling, 
-                    file_source="simTriple2Triple1D_task1_gp.tsv", file_target="0_simTriple2Triple1D_task2_task1-gp.tsv", num_exp=100)
+                    file_source="simTriple2Triple1D_task1_gp.tsv", file_target="0_simTriple2Triple1D_task2_task1-gp.tsv", num_exp=100, num_workers=os.cpu_count())
 
     print("1D Sampling: ")
     for i in lst_sim_t_s_1D:
@@ -381,7 +407,7 @@ if __name__ == "__main__":
     # 2.2 2D sampling targets
     data_dir_1D_sampling = "data/sampling_experiments/Dimension-2"
     lst_norm_source_2D, lst_norm_target_2D, lst_norm_diff_2D, lst_sim_t_s_2D = compute_similarity_batch(data_dir_1D_sampling, 
-                    file_source="simTriple2Triple2D_task1_gp.tsv", file_target="0_simTriple2Triple2D_task2_task1-gp.tsv", num_exp=100)
+                    file_source="simTriple2Triple2D_task1_gp.tsv", file_target="0_simTriple2Triple2D_task2_task1-gp.tsv", num_exp=100, num_workers=os.cpu_count())
 
     print("2D Sampling: ")
     for i in lst_sim_t_s_2D:
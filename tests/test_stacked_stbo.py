@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+checks of StackedShapeTransferBO against ShapeTransferBO and its own pointwise predictions
+run with "python -m pytest tests" from the repository root
+"""
+import os, sys
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from optimization import ShapeTransferBO, StackedShapeTransferBO
+from points_io import write_table, default_columns
+
+
+def write_task(file, fun, num_points, seed, dim=2):
+    "write num_points random points of fun on [-5, 5]^dim to file"
+    rng = np.random.default_rng(seed)
+    points = rng.uniform(-5, 5, size=(num_points, dim))
+    write_table(file, default_columns(dim), np.column_stack([fun(points), points]))
+
+    return 0
+
+def source_fun(shift):
+    "smooth test function shifted by shift in every dim"
+    return lambda points: np.exp(-np.sum((points - shift)**2, axis=1) / 8) + 0.1*np.sin(points[:, 0])
+
+def test_one_source_stack_matches_stbo(tmp_path):
+    "a stack with one source layer is ShapeTransferBO, also after appending target points"
+    file_source = str(tmp_path / "source.tsv")
+    file_target = str(tmp_path / "target.tsv")
+    write_task(file_source, source_fun(0.0), 30, 0)
+    write_task(file_target, source_fun(0.5), 4, 1)
+
+    stbo = ShapeTransferBO()
+    stbo.get_data_from_file(file_target)
+    stbo.build_task1_gp(file_source)
+    stbo.build_diff_gp()
+
+    stacked = StackedShapeTransferBO()
+    stacked.get_data_from_file(file_target)
+    stacked.add_source_gp(file_source)
+    stacked.build_diff_gp()
+
+    points = np.random.default_rng(2).uniform(-6, 6, size=(50, 2))
+    start_points = np.random.default_rng(3).uniform(-5, 5, size=(8, 2)).tolist()
+
+    for round_k in range(3):
+        for pred_stbo, pred_stacked in zip(stbo.predict_batch(points, return_grad=True), stacked.predict_batch(points, return_grad=True)):
+            assert np.allclose(pred_stbo, pred_stacked, rtol=1e-10, atol=1e-12)
+
+        next_stbo, aux_stbo = stbo.find_best_NextPoint_ei(start_points, num_step=50)
+        next_stacked, aux_stacked = stacked.find_best_NextPoint_ei(start_points, num_step=50)
+        assert np.allclose(next_stbo, next_stacked) and np.isclose(aux_stbo, aux_stacked)
+
+        response = source_fun(0.5)(np.array([next_stbo]))[0]
+        stbo.append_observation(next_stbo, response)
+        stacked.append_observation(next_stbo, response)
+
+def test_predict_batch_matches_pointwise(tmp_path):
+    "batched mean, variance and gradients of a three layer stack equal the pointwise ones"
+    stacked = StackedShapeTransferBO()
+    file_target = str(tmp_path / "target.tsv")
+    write_task(file_target, source_fun(1.0), 5, 10)
+    stacked.get_data_from_file(file_target)
+
+    for k, shift in enumerate([0.0, 0.3, 0.6]):
+        file_source = str(tmp_path / ("source_" + str(k) + ".tsv"))
+        write_task(file_source, source_fun(shift), 20, k)
+        stacked.add_source_gp(file_source)
+    stacked.build_diff_gp()
+
+    points = np.random.default_rng(4).uniform(-5, 5, size=(20, 2))
+    mean, var, grad_mean, grad_var = stacked.predict_batch(points, return_grad=True)
+
+    for i, point in enumerate(points.tolist()):
+        assert np.isclose(mean[i], stacked.compute_mean(point), rtol=1e-8, atol=1e-10)
+        assert np.isclose(var[i], stacked.compute_var(point), rtol=1e-8, atol=1e-10)
+        assert np.allclose(grad_mean[i], np.ravel(stacked.compute_grad_mean(point)), rtol=1e-8, atol=1e-10)
+        assert np.allclose(grad_var[i], np.ravel(stacked.compute_grad_var(point)), rtol=1e-8, atol=1e-10)
+
+def test_cached_stack_matches_fitted_stack(tmp_path):
+    "a stack reloaded from cache_dir predicts as the freshly fitted one"
+    file_target = str(tmp_path / "target.tsv")
+    write_task(file_target, source_fun(1.0), 5, 10)
+    files_source = []
+    for k, shift in enumerate([0.0, 0.4]):
+        files_source.append(str(tmp_path / ("source_" + str(k) + ".tsv")))
+        write_task(files_source[-1], source_fun(shift), 20, k)
+
+    preds = []
+    for run in range(2):    # the first run fits and saves the layers, the second one loads them
+        stacked = StackedShapeTransferBO()
+        stacked.get_data_from_file(file_target)
+        for file_source in files_source:
+            stacked.add_source_gp(file_source, cache_dir=str(tmp_path / "cache"))
+        stacked.build_diff_gp()
+        preds.append(stacked.predict_batch(np.random.default_rng(5).uniform(-5, 5, size=(10, 2))))
+
+    assert np.allclose(preds[0][0], preds[1][0]) and np.allclose(preds[0][1], preds[1][1])
@@ -0,0 +1,145 @@
+# Copyright (c) 2021 Robert Bosch GmbH
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark of the `GPBO` prediction hot paths.
+
+Compares `GPBO` with `CopyingGPBO`, which restores the input copies of the previous
+implementation (copied test inputs, deep-copied predictions and the training inputs
+re-normalized on every `predict_posterior_mean` call). Reports the time and the peak
+memory traced by `tracemalloc` per call. Requires GPy.
+
+    python benchmarks/benchmark_gpbo_predict.py --n_train 5000 --n_calls 1000
+"""
+
+import argparse
+import copy
+import timeit
+import tracemalloc
+from typing import Callable, Tuple
+
+import numpy as np
+from GPy.kern import RBF
+
+from transfergpbo.models import GPBO, TaskData, InputData
+from transfergpbo.models.utils import is_pd, nearest_pd
+
+
+class CopyingGPBO(GPBO):
+    """`GPBO` with the input copies of the previous prediction paths."""
+
+    def _denormalize(
+        self, mean: np.ndarray, var: np.ndarray, return_full: bool
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        mean, var = copy.deepcopy(mean), copy.deepcopy(var)
+        mean = self._y_normalizer.inverse_transform(mean)
+        if return_full & (mean.shape[1] > 1):
+            var = var[..., np.newaxis] * self._y_normalizer.var_
+        else:
+            var *= self._y_normalizer.var_
+        return mean, var
+
+    def _raw_predict(
+        self, data: InputData, return_full: bool = False, with_noise: bool = False
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        _X_test = data.X.copy()
+        if self._normalize:
+            _X_test = self._x_normalizer.transform(_X_test)
+        mu, cov = self._gpy_model.predict(
+            _X_test, full_cov=return_full, include_likelihood=with_noise
+        )
+        if return_full:
+            if not is_pd(cov):
+                cov = nearest_pd(cov)
+        else:
+            cov = np.clip(cov, 1e-20, None)
+        return mu, cov
+
+    def predict_posterior_mean(self, data: InputData) -> np.ndarray:
+        _x = data.X.copy()
+        _X = self._X.copy()
+        if self._normalize:
+            _x = self._x_normalizer.transform(_x)
+            _X = self._x_normalizer.transform(_X)
+        mu = self._kernel.K(_x, _X) @ self._gpy_model.posterior.woodbury_vector
+        if self._normalize:
+            mu = self._y_normalizer.inverse_transform(mu)
+        return mu
+
+    def compute_kernel(self, x1: InputData, x2: InputData) -> np.ndarray:
+        _x1, _x2 = np.copy(x1.X), np.copy(x2.X)
+        if self._normalize and self._X is not None:
+            _x1 = self._x_normalizer.transform(_x1)
+            _x2 = self._x_normalizer.transform(_x2)
+        return self._kernel.K(_x1, _x2)
+
+
+def measure(fun: Callable, n_calls: int) -> Tuple[float, float]:
+    """Return time per call in ms and peak traced memory of one call in KB."""
+    fun()
+    seconds = timeit.timeit(fun, number=n_calls) / n_calls
+    tracemalloc.start()
+    fun()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return 1e3 * seconds, peak / 1e3
+
+
+def main(n_train: int, n_test: int, n_dims: int, n_calls: int):
+    rng = np.random.default_rng(0)
+    X = rng.uniform(-3, 3, (n_train, n_dims))
+    y = np.sin(X[:, :1]) + X[:, 1:].sum(axis=1, keepdims=True)
+    x_point = InputData(rng.uniform(-3, 3, (1, n_dims)))
+    x_batch = InputData(rng.uniform(-3, 3, (n_test, n_dims)))
+
+    models = {}
+    for name, model_class in [("copying", CopyingGPBO), ("GPBO", GPBO)]:
+        models[name] = model_class(kernel=RBF(n_dims, lengthscale=0.8))
+        models[name].fit(TaskData(X, y))
+
+    calls = {
+        "predict_posterior_mean, 1 point": lambda model: model.predict_posterior_mean(
+            x_point
+        ),
+        "predict, 1 point": lambda model: model.predict(x_point),
+        f"predict(return_full=True), {n_test} points": lambda model: model.predict(
+            x_batch, return_full=True
+        ),
+        f"compute_kernel, {n_test} x {n_train}": lambda model: model.compute_kernel(
+            x_batch, InputData(X)
+        ),
+    }
+
+    print(f"{n_train} training points, {n_dims} dims, {n_calls} calls")
+    for call_name, call in calls.items():
+        results = {}
+        for name, model in models.items():
+            results[name] = call(model)
+            ms, kb = measure(lambda: call(model), n_calls)
+            print(f"{call_name:40s} {name:8s} {ms:9.3f} ms/call {kb:10.1f} KB peak")
+        # both implementations predict the same values
+        for name, result in results.items():
+            results[name] = result if isinstance(result, tuple) else (result,)
+        for result_copying, result in zip(results["copying"], results["GPBO"]):
+            np.testing.assert_array_equal(result_copying, result)
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    argparser.add_argument("--n_train", type=int, default=5000)
+    argparser.add_argument("--n_test", type=int, default=200)
+    argparser.add_argument("--n_dims", type=int, default=3)
+    argparser.add_argument("--n_calls", type=int, default=200)
+    args = argparser.parse_args()
+    main(args.n_train, args.n_test, args.n_dims, args.n_calls)
@@ -52,6 +52,6 @@ setup(
         "Programming Language :: Python :: 3",
         "Programming Language :: Python :: 3.10",
     ],
-    packages=find_packages(exclude=["doc", "tests"]),
+    packages=find_packages(exclude=["benchmarks", "doc", "tests"]),
     install_requires=requires,
 )
@@ -0,0 +1,81 @@
+# Copyright (c) 2021 Robert Bosch GmbH
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Checks of `GPBO.sample` against the predicted posterior of a fitted GPy model.
+Run with `pytest tests` from the `transfergpbo` directory (requires GPy)."""
+
+import numpy as np
+import pytest
+from GPy.kern import RBF, Matern52
+
+from transfergpbo.models import GPBO, TaskData, InputData
+
+
+def _fit_gpbo(kernel) -> GPBO:
+    rng = np.random.default_rng(0)
+    X = rng.uniform(-3, 3, (15, 2))
+    y = 3 * np.sin(X[:, :1]) + X[:, 1:] + 5
+    model = GPBO(kernel=kernel, noise_variance=0.02)
+    model.fit(TaskData(X, y))
+    return model
+
+
+@pytest.mark.parametrize(
+    "kernel",
+    [
+        RBF(2, variance=1.3, lengthscale=0.8),
+        RBF(2, ARD=True, lengthscale=[0.8, 1.5]),
+        RBF(1, active_dims=[1], lengthscale=0.8),
+    ],
+)
+@pytest.mark.parametrize("with_noise", [False, True])
+@pytest.mark.parametrize("n_features, cov_tol", [(None, 0.02), (4000, 0.06)])
+def test_sample_moments_match_predict(kernel, with_noise, n_features, cov_tol):
+    model = _fit_gpbo(kernel)
+    data = InputData(np.random.default_rng(1).uniform(-3, 3, (6, 2)))
+
+    mean, cov = model.predict(data, return_full=True, with_noise=with_noise)
+    samples = model.sample(
+        data,
+        size=40000,
+        with_noise=with_noise,
+        rng=np.random.default_rng(2),
+        n_features=n_features,
+    )
+
+    scale = np.abs(cov).max()
+    assert samples.shape == (6, 40000)
+    assert np.abs(samples.mean(axis=1) - mean.flatten()).max() < 0.02 * np.sqrt(scale)
+    assert np.abs(np.cov(samples) - cov).max() < cov_tol * scale
+
+
+@pytest.mark.parametrize("n_features", [None, 4000])
+def test_sample_moments_of_empty_gp(n_features):
+    model = GPBO(kernel=RBF(2, variance=1.3, lengthscale=0.8))
+    data = InputData(np.random.default_rng(1).uniform(-3, 3, (6, 2)))
+
+    _, cov = model.predict(data, return_full=True)
+    samples = model.sample(
+        data, size=40000, rng=np.random.default_rng(2), n_features=n_features
+    )
+
+    assert np.abs(samples.mean(axis=1)).max() < 0.03
+    assert np.abs(np.cov(samples) - cov).max() < 0.06 * np.abs(cov).max()
+
+
+def test_pathwise_sample_requires_rbf_kernel():
+    model = _fit_gpbo(Matern52(2))
+    with pytest.raises(ValueError):
+        model.sample(InputData(np.zeros((2, 2))), n_features=100)
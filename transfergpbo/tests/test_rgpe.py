@@ -0,0 +1,129 @@
+# Copyright (c) 2021 Robert Bosch GmbH
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Regression checks of the closed-form leave-one-out loss of `RGPE` against the
+leave-one-out refits it replaces. Run with `pytest tests` from the `transfergpbo`
+directory (requires GPy)."""
+
+import copy
+
+import numpy as np
+import pytest
+from GPy.kern import RBF
+
+from transfergpbo.models import RGPE, TaskData, InputData
+
+
+def _make_rgpe(n_points: int, n_samples: int, normalize: bool = False) -> RGPE:
+    """RGPE with one source task and `n_points` target points."""
+    rng = np.random.default_rng(0)
+    X = rng.uniform(-2, 2, (n_points, 2))
+    y = np.sin(2 * X[:, :1]) + X[:, 1:] + 0.1 * rng.normal(size=(n_points, 1))
+    X_source = rng.uniform(-2, 2, (20, 2))
+    y_source = np.sin(2 * X_source[:, :1]) + 0.5 * X_source[:, 1:]
+
+    model = RGPE(
+        n_samples=n_samples,
+        kernel=RBF(2, lengthscale=0.7),
+        noise_variance=0.05,
+        normalize=normalize,
+    )
+    model.meta_fit({0: TaskData(X_source, y_source)})
+    model.fit(TaskData(X, y), optimize=False)
+    return model
+
+
+def _refit_loo_posteriors(model: RGPE, X: np.ndarray, y: np.ndarray):
+    """Leave-one-out posteriors by refitting a copy of the target model, in the
+    normalized space of each refit."""
+    target_model = copy.deepcopy(model._target_model)
+    posteriors = []
+    for i in range(X.shape[0]):
+        target_model.fit(
+            TaskData(np.delete(X, i, axis=0), np.delete(y, i, axis=0)),
+            optimize=False,
+        )
+        mean, cov = target_model.predict(
+            InputData(X), return_full=True, with_noise=True
+        )
+        if target_model.y_normalizer is not None:
+            mean = target_model.y_normalizer.transform(mean)
+            cov = cov / target_model.y_normalizer.scale_**2
+        posteriors.append((mean, cov))
+    return posteriors
+
+
+def _refit_target_loss(model: RGPE) -> np.ndarray:
+    """Target model loss of the deepcopy-and-refit loop used before the closed form."""
+    X, indices = np.unique(model._X, axis=0, return_index=True)
+    y = model._y[indices]
+    n_points = X.shape[0]
+    sample_comps = np.empty((n_points, n_points, model._n_samples), dtype=bool)
+    for i, (mean, cov) in enumerate(_refit_loo_posteriors(model, X, y)):
+        samples = np.random.multivariate_normal(
+            mean.flatten(), cov, model._n_samples
+        ).T
+        sample_comps[i] = samples[i, :] < samples
+    return model._compute_loss([sample_comps], y)
+
+
+@pytest.mark.parametrize("normalize", [False, True])
+def test_loo_posteriors_match_refits(normalize):
+    model = _make_rgpe(n_points=12, n_samples=16, normalize=normalize)
+    X, indices = np.unique(model._X, axis=0, return_index=True)
+    y = model._y[indices]
+
+    posteriors = zip(model._loo_posteriors(X, y), _refit_loo_posteriors(model, X, y))
+    for (mean, factor), (mean_refit, cov_refit) in posteriors:
+        np.testing.assert_allclose(mean, mean_refit.flatten(), atol=1e-6)
+        np.testing.assert_allclose(factor @ factor.T, cov_refit, atol=1e-6)
+
+
+@pytest.mark.parametrize("normalize", [False, True])
+@pytest.mark.parametrize("n_points", [3, 10])
+def test_target_loss_matches_refit_loop(n_points, normalize):
+    model = _make_rgpe(n_points=n_points, n_samples=4000, normalize=normalize)
+
+    np.random.seed(1)
+    loss = model._target_loss()
+    np.random.seed(2)
+    loss_refit = _refit_target_loss(model)
+
+    assert loss.shape == loss_refit.shape == (4000,)
+    standard_error = np.sqrt((loss.var() + loss_refit.var()) / 4000)
+    assert abs(loss.mean() - loss_refit.mean()) < 5 * standard_error + 1e-12
+    assert abs(loss.std() - loss_refit.std()) < 0.1 * loss_refit.std() + 1e-12
+
+
+def test_weights_independent_of_num_workers():
+    rng = np.random.default_rng(0)
+    X = rng.uniform(-2, 2, (15, 2))
+    y = np.sin(X[:, :1]) + X[:, 1:]
+    metadata = {
+        task_uid: TaskData(X + 0.1 * task_uid, y + 0.2 * task_uid * X[:, :1])
+        for task_uid in range(5)
+    }
+
+    weights = []
+    for num_workers in [1, 3, None]:
+        np.random.seed(0)
+        model = RGPE(n_samples=256, num_workers=num_workers, kernel=RBF(2))
+        model.meta_fit(metadata)
+        model.fit(TaskData(X[:8], y[:8]))
+        weights.append(
+            [model._target_model_weight] + list(model._source_gp_weights.values())
+        )
+
+    assert weights[0] == weights[1] == weights[2]
@@ -13,13 +13,17 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import Callable, Union, Dict, Hashable
+from typing import Callable, Union, Dict, Hashable, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import pickle
 import numpy as np
 import pandas as pd
 import scipy.optimize as opt
 import os
 
 from emukit.core.interfaces import IModel
+from emukit.core.acquisition import Acquisition
 from emukit.core.optimization import GradientAcquisitionOptimizer
 from emukit.core import ParameterSpace
 from emukit.bayesian_optimization.acquisitions import (
@@ -56,6 +60,139 @@ def shgo_minimize(fun: Callable, search_space: ParameterSpace) -> opt.OptimizeRe
     return opt.shgo(objective, bounds=bounds, sampling_method="sobol")
 
 
+# acquisition function of a worker process as `(version, acquisition)`, replaced
+# whenever a new version is sent by `optimize_acquisition_parallel`
+_worker_acquisition = (None, None)
+
+# versions of the acquisition functions sent to the workers of a pool
+_acquisition_versions = itertools.count()
+
+
+def _maximize_from_anchors(
+    version: int, acquisition_bytes: bytes, anchors: np.ndarray, bounds: list
+) -> list:
+    """Maximize an acquisition function from a chunk of anchors in a worker process.
+
+    The pickled acquisition function is only unpickled if the worker has not seen
+    its version yet.
+
+    Args:
+        version: Version of the acquisition function.
+        acquisition_bytes: The pickled acquisition function.
+        anchors: Start points of the local optimizations. `shape = (n_anchors, n_dims)`
+        bounds: List of `(lower, upper)` bounds of each dimension.
+
+    Returns:
+        List of the local maximizers and acquisition values, one per anchor.
+    """
+    global _worker_acquisition
+    if _worker_acquisition[0] != version:
+        _worker_acquisition = (version, pickle.loads(acquisition_bytes))
+
+    return [_maximize_from_anchor(anchor, bounds) for anchor in anchors]
+
+
+def _maximize_from_anchor(
+    anchor: np.ndarray, bounds: list
+) -> Tuple[np.ndarray, float]:
+    """Maximize the worker's acquisition function with L-BFGS-B from one anchor point.
+
+    Args:
+        anchor: Start point of the local optimization. `shape = (n_dims,)`
+        bounds: List of `(lower, upper)` bounds of each dimension.
+
+    Returns:
+        The local maximizer and the acquisition value at the local maximizer.
+    """
+    acquisition = _worker_acquisition[1]
+
+    def objective(x):
+        x = np.atleast_2d(x)
+        if acquisition.has_gradients:
+            value, gradient = acquisition.evaluate_with_gradients(x)
+            return -value[0, 0], -gradient[0]
+        return -acquisition.evaluate(x)[0, 0]
+
+    res = opt.minimize(
+        objective,
+        anchor,
+        jac=acquisition.has_gradients,
+        method="L-BFGS-B",
+        bounds=bounds,
+    )
+    return res.x, -float(res.fun)
+
+
+def optimize_acquisition_parallel(
+    acquisition: Acquisition,
+    space: ParameterSpace,
+    num_anchor: int = 8,
+    num_samples: int = 1000,
+    num_workers: int = None,
+    pool: ProcessPoolExecutor = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Maximize an acquisition function from several anchors on a process pool.
+
+    As in `GradientAcquisitionOptimizer`, the anchors are the best of `num_samples`
+    uniform samples. The local optimizations from the anchors run in parallel; the
+    acquisition function and its fitted model are pickled once per call and sent
+    once per worker process, not once per anchor. Only continuous parameter spaces
+    are supported.
+
+    Args:
+        acquisition: The acquisition function to be maximized.
+        space: Search space with valid bounds.
+        num_anchor: Number of anchor points for the local optimizations.
+        num_samples: Number of uniform samples to choose the anchors from.
+        num_workers: Number of worker processes, defaults to the number of CPUs.
+        pool: Process pool with `num_workers` processes kept over the BO
+            iterations. A new pool is started for this call if `None`.
+
+    Returns:
+        The maximizer, `shape = (1, n_dims)`, and the acquisition value at the
+        maximizer, `shape = (1, 1)`.
+    """
+    samples = space.sample_uniform(num_samples)
+    sample_values = acquisition.evaluate(samples)[:, 0]
+    anchors = samples[np.argsort(-sample_values)[:num_anchor]]
+    bounds = space.get_bounds()
+
+    if pool is None:
+        with ProcessPoolExecutor(max_workers=num_workers) as new_pool:
+            return optimize_acquisition_parallel(
+                acquisition, space, num_anchor, num_samples, num_workers, new_pool
+            )
+
+    num_chunks = min(num_workers or os.cpu_count(), len(anchors))
+    version = next(_acquisition_versions)
+    acquisition_bytes = pickle.dumps(acquisition)
+    futures = [
+        pool.submit(_maximize_from_anchors, version, acquisition_bytes, chunk, bounds)
+        for chunk in np.array_split(anchors, num_chunks)
+    ]
+    results = [result for future in futures for result in future.result()]
+
+    x_best, value_best = max(results, key=lambda result: result[1])
+    return np.atleast_2d(x_best), np.atleast_2d(value_best)
+
+
+def _optimize_acquisition(
+    acquisition: Acquisition,
+    space: ParameterSpace,
+    num_anchor: int = 1,
+    num_workers: int = None,
+    pool: ProcessPoolExecutor = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Maximize the acquisition function sequentially or on a process pool."""
+    if num_workers is None or num_workers <= 1:
+        optimizer = GradientAcquisitionOptimizer(space, num_anchor=num_anchor)
+        return optimizer.optimize(acquisition)
+
+    return optimize_acquisition_parallel(
+        acquisition, space, num_anchor=num_anchor, num_workers=num_workers, pool=pool
+    )
+
+
 def run_bo(
     experiment_fun: Callable,
     model: Union[Model, IModel],
@@ -66,9 +203,16 @@ def run_bo(
     noiseless_fun: Callable = None,
     dir_target_points: str = None,
     file_target_points: str = None,
-    num_rep: int = None
+    num_rep: int = None,
+    num_anchor: int = 1,
+    num_workers: int = None,
 ):
-    """Runs Bayesian optimization."""
+    """Runs Bayesian optimization.
+
+    The acquisition function is maximized from `num_anchor` anchor points, in
+    parallel on `num_workers` processes if `num_workers > 1`. The processes are
+    started once and kept for all iterations.
+    """
 
     if noiseless_fun:
         f_min = shgo_minimize(noiseless_fun, space).fun
@@ -77,50 +221,58 @@ def run_bo(
 
     file_target = os.path.join(dir_target_points, str(num_rep), file_target_points)
 
+    # one process pool for all iterations, the workers are not restarted per step
+    pool = None
+    if num_workers is not None and num_workers > 1:
+        pool = ProcessPoolExecutor(max_workers=num_workers)
+
     regret = []
-    for i in range(num_iter):
-        print(f"Processing for step: {i + 1}")
-
-        if i == 0: # only support 1 source Now
-            if "rand" in start_bo or "Rand" in start_bo:
-                # sample a random point for the first experiment
-                print(f"Initial step: random sample X at 1st step")                  
-                X_new = space.sample_uniform(1)
-                Y_new = experiment_fun(X_new)
-                X, Y = X_new, Y_new
-            else:
-                print(f"Initial step: start from best source point")
-                X_new = np.array([best_X_source[0].tolist()])                   
-                Y_new = experiment_fun(X_new)
-                X, Y = X_new, Y_new
+    try:
+        for i in range(num_iter):
+            print(f"Processing for step: {i + 1}")
+
+            if i == 0: # only support 1 source Now
+                if "rand" in start_bo or "Rand" in start_bo:
+                    # sample a random point for the first experiment
+                    print(f"Initial step: random sample X at 1st step")                  
+                    X_new = space.sample_uniform(1)
+                    Y_new = experiment_fun(X_new)
+                    X, Y = X_new, Y_new
+                else:
+                    print(f"Initial step: start from best source point")
+                    X_new = np.array([best_X_source[0].tolist()])                   
+                    Y_new = experiment_fun(X_new)
+                    X, Y = X_new, Y_new
                 
-            # add header: response#dim1#...#dimN
-            with open(file_target, "w", encoding="utf-8") as fout:
-                header_x = '#'.join(["dim"+str(dim) for dim in range(len(X[0]))])
-                fout.writelines("response#" + header_x + '\n')
-                line = str(-1*Y_new[0][0]) + '\t' + '\t'.join([str(x_dim) for x_dim in X_new[0]])
-                fout.writelines(line+'\n')
-        else:  # optimize the AF
-            #af = UCB(model, beta=np.float64(3.0))
-            af = EI(model)
-            optimizer = GradientAcquisitionOptimizer(space)
-            X_new, _ = optimizer.optimize(af)
-            Y_new = experiment_fun(X_new)
+                # add header: response#dim1#...#dimN
+                with open(file_target, "w", encoding="utf-8") as fout:
+                    header_x = '#'.join(["dim"+str(dim) for dim in range(len(X[0]))])
+                    fout.writelines("response#" + header_x + '\n')
+                    line = str(-1*Y_new[0][0]) + '\t' + '\t'.join([str(x_dim) for x_dim in X_new[0]])
+                    fout.writelines(line+'\n')
+            else:  # optimize the AF
+                #af = UCB(model, beta=np.float64(3.0))
+                af = EI(model)
+                X_new, _ = _optimize_acquisition(af, space, num_anchor, num_workers, pool)
+                Y_new = experiment_fun(X_new)
             
-            with open(file_target, "a", encoding="utf-8") as fout:
-                line = str(-1*Y_new[0][0]) + '\t' + '\t'.join([str(x_dim) for x_dim in X_new[0]])
-                fout.writelines(line + '\n')
+                with open(file_target, "a", encoding="utf-8") as fout:
+                    line = str(-1*Y_new[0][0]) + '\t' + '\t'.join([str(x_dim) for x_dim in X_new[0]])
+                    fout.writelines(line + '\n')
 
-            X = np.append(X, X_new, axis=0)
-            Y = np.append(Y, Y_new, axis=0)
+                X = np.append(X, X_new, axis=0)
+                Y = np.append(Y, Y_new, axis=0)
 
-        print(f"Next training point is: {X_new}, {Y_new}")
+            print(f"Next training point is: {X_new}, {Y_new}")
 
-        model.fit(TaskData(X, Y), optimize=True)
+            model.fit(TaskData(X, Y), optimize=True)
 
-        if f_min is not None:
-            f_min_observed = np.min(experiment_fun(X, output_noise=0.0))
-            regret.append((f_min_observed - f_min).item())
+            if f_min is not None:
+                f_min_observed = np.min(experiment_fun(X, output_noise=0.0))
+                regret.append((f_min_observed - f_min).item())
+    finally:
+        if pool is not None:
+            pool.shutdown()
 
     print("BO loop is finished.")
     
@@ -134,9 +286,14 @@ def run_bo_interactive(
         start_bo: str = "random", 
         dir_target_points: str = None,
         file_target_points: str = None,
-        num_rep: int = None
+        num_rep: int = None,
+        num_anchor: int = 1,
+        num_workers: int = None,
 ):
-    """Runs Bayesian optimization interatively."""
+    """Runs Bayesian optimization interatively.
+
+    See `run_bo` for `num_anchor` and `num_workers`.
+    """
 
     file_target = os.path.join(dir_target_points, str(num_rep), file_target_points)
 
@@ -167,8 +324,7 @@ def run_bo_interactive(
 
     #af = UCB(model, beta=np.float64(3.0))
     af = EI(model)
-    optimizer = GradientAcquisitionOptimizer(space)
-    X_new, _ = optimizer.optimize(af)
+    X_new, _ = _optimize_acquisition(af, space, num_anchor, num_workers)
     
     with open(file_target, 'a', encoding="utf-8") as fout:
         line = '_\t' + '\t'.join([str(x_dim) for x_dim in X_new[0]])
@@ -96,6 +96,9 @@ class WrapperBase(IModel):
         self._wrapped_model = model
 
     def __getattr__(self, item):
+        # `_wrapped_model` is not set yet while unpickling, e.g. in a worker process
+        if item == "_wrapped_model":
+            raise AttributeError(item)
         return getattr(self._wrapped_model, item)
 
     @property
@@ -15,6 +15,7 @@
 
 import copy
 import numpy as np
+import scipy
 from typing import Tuple, Dict, Hashable
 from sklearn.preprocessing import StandardScaler
 
@@ -22,7 +23,7 @@ from GPy.models import GPRegression
 from GPy.kern import RBF, Kern
 
 from transfergpbo.models import InputData, TaskData, Model
-from transfergpbo.models.utils import is_pd, nearest_pd
+from transfergpbo.models.utils import is_pd, nearest_pd, compute_cholesky
 
 
 class GPBO(Model):
@@ -55,6 +56,7 @@ class GPBO(Model):
 
         self._noise_variance = np.array(noise_variance)
         self._gpy_model = None
+        self._X_normalized = None
 
         self._normalize = normalize
         self._x_normalizer = StandardScaler() if normalize else None
@@ -112,12 +114,17 @@ class GPBO(Model):
         self._X = np.copy(data.X)
         self._y = np.copy(data.Y)
 
-        _X = np.copy(self._X)
-        _y = np.copy(self._y)
-
+        # the GPy model gets its own arrays: the normalizers return new ones, without
+        # normalization the stored data is copied once (fit is not a hot path)
         if self._normalize:
-            _X = self._x_normalizer.fit_transform(_X)
-            _y = self._y_normalizer.fit_transform(_y)
+            _X = self._x_normalizer.fit_transform(self._X)
+            _y = self._y_normalizer.fit_transform(self._y)
+        else:
+            _X, _y = np.copy(self._X), np.copy(self._y)
+
+        # read-only view of the normalized training inputs for the predictions
+        self._X_normalized = _X.view()
+        self._X_normalized.flags.writeable = False
 
         if self._gpy_model is None:
             self._gpy_model = GPRegression(
@@ -157,14 +164,13 @@ class GPBO(Model):
             - var - Normalized variance or covariance. `shape = (n_points, 1)` or
                 `(n_points, n_points)`
         """
-        mean, var = copy.deepcopy(mean), copy.deepcopy(var)
-
+        # inputs are not modified, both results are new arrays
         mean = self._y_normalizer.inverse_transform(mean)
 
         if return_full & (mean.shape[1] > 1):
             var = var[..., np.newaxis] * self._y_normalizer.var_
         else:
-            var *= self._y_normalizer.var_
+            var = var * self._y_normalizer.var_
 
         return mean, var
 
@@ -190,7 +196,7 @@ class GPBO(Model):
 
         Same input/output as `self.predict()`.
         """
-        _X_test = data.X.copy()
+        _X_test = data.X
 
         if self.X is None:
             mu = np.zeros((_X_test.shape[0], 1))
@@ -228,14 +234,15 @@ class GPBO(Model):
         Returns:
             The mean prediction. `shape = (n_points, 1)`
         """
-        _x = data.X.copy()
+        _x = data.X
         if self._X is None:
             return np.zeros(_x.shape)
-        _X = self._X.copy()
         if self._normalize:
             _x = self._x_normalizer.transform(_x)
-            _X = self._x_normalizer.transform(_X)
-        mu = self._kernel.K(_x, _X) @ self._gpy_model.posterior.woodbury_vector
+        mu = (
+            self._kernel.K(_x, self._X_normalized)
+            @ self._gpy_model.posterior.woodbury_vector
+        )
         if self._normalize:
             mu = self._y_normalizer.inverse_transform(mu)
         return mu
@@ -254,8 +261,8 @@ class GPBO(Model):
         Returns:
             Predicted covariance for every input. `shape = (n_points_1, n_points_2)`
         """
-        _X1 = x1.X.copy()
-        _X2 = x2.X.copy()
+        _X1 = x1.X
+        _X2 = x2.X
 
         if self._X is None:
             cov = self._kernel.K(_X1, _X2)
@@ -287,7 +294,7 @@ class GPBO(Model):
         Returns:
             Kernel values at `(x1, x2)`. `shape = (n_points_1, n_points_2)`
         """
-        _x1, _x2 = np.copy(x1.X), np.copy(x2.X)
+        _x1, _x2 = x1.X, x2.X
         if self._normalize and self._X is not None:
             _x1 = self._x_normalizer.transform(_x1)
             _x2 = self._x_normalizer.transform(_x2)
@@ -306,30 +313,143 @@ class GPBO(Model):
         Returns:
             Kernel diagonal. `shape = (n_points, 1)`
         """
-        _x = np.copy(data.X)
+        _x = data.X
         if self._normalize and self._X is not None:
             _x = self._x_normalizer.transform(_x)
         return self._kernel.Kdiag(_x).reshape(-1, 1)
 
     def sample(
-        self, data: InputData, size: int = 1, with_noise: bool = False
+        self,
+        data: InputData,
+        size: int = 1,
+        with_noise: bool = False,
+        rng: np.random.Generator = None,
+        n_features: int = None,
     ) -> np.ndarray:
         """Perform model inference.
 
         Sample functions from the posterior distribution for the given test points.
 
+        By default, the samples are drawn from the Cholesky decomposition of the
+        posterior covariance, with jitter added to its diagonal if it is singular. If
+        `n_features` is given, the samples are drawn pathwise instead: prior samples
+        from random Fourier features are updated with the training data. This scales
+        linearly in the number of test points and requires an `RBF` kernel.
+
         Args:
             data: Input data to predict on. `shape = (n_points, n_features)`
             size: Number of functions to sample.
             with_noise: If `False`, the latent function `f` is considered. If `True`,
                 the observed function `y` that includes the noise variance is
                 considered.
+            rng: Random number generator to draw the samples with. Defaults to the
+                global `np.random` state.
+            n_features: Number of random Fourier features for pathwise sampling.
 
         Returns:
             Sampled function value for every input. `shape = (n_points, size)`
         """
-        mean, cov = self.predict(data, return_full=True, with_noise=with_noise)
-        mean = mean.flatten()
-        sample = np.random.multivariate_normal(mean, cov, size).T
-        
+        random = np.random if rng is None else rng
+
+        _X_test = data.X
+        if self._normalize and self._X is not None:
+            _X_test = self._x_normalizer.transform(_X_test)
+
+        if n_features is None:
+            mu, cov = self._raw_predict_full(_X_test, with_noise)
+            chol = compute_cholesky(cov)
+            sample = mu + chol @ random.standard_normal((mu.shape[0], size))
+        else:
+            sample = self._sample_pathwise(_X_test, size, with_noise, n_features, random)
+
+        if self._normalize and self._X is not None:
+            sample = sample * self._y_normalizer.scale_ + self._y_normalizer.mean_
+
+        return sample
+
+    def _raw_predict_full(
+        self, _X_test: np.ndarray, with_noise: bool = False
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Predict mean and full covariance for normalized test points without
+        repairing the covariance matrix.
+
+        Args:
+            _X_test: Normalized input data. `shape = (n_points, n_features)`
+            with_noise: Include the noise variance.
+
+        Returns:
+            - mean - Normalized mean. `shape = (n_points, 1)`
+            - cov - Normalized covariance. `shape = (n_points, n_points)`
+        """
+        if self._X is None:
+            return np.zeros((_X_test.shape[0], 1)), self._kernel.K(_X_test)
+
+        return self._gpy_model.predict(
+            _X_test, full_cov=True, include_likelihood=with_noise
+        )
+
+    def _sample_pathwise(
+        self,
+        _X_test: np.ndarray,
+        size: int,
+        with_noise: bool,
+        n_features: int,
+        random: np.random.Generator,
+    ) -> np.ndarray:
+        r"""Sample functions for normalized test points by pathwise conditioning.
+
+        Based on the paper "Efficiently Sampling Functions from Gaussian Process
+        Posteriors" by James T. Wilson et al. (2020). Prior samples are drawn from
+        random Fourier features of the `RBF` kernel and updated with
+        $k(x, X)\left(k(X, X) + \sigma^2\mathbb 1\right)^{-1}(y - f(X) - \epsilon)$.
+        All samples share the random features and differ in their weights.
+
+        Args:
+            _X_test: Normalized input data. `shape = (n_points, n_features)`
+            size: Number of functions to sample.
+            with_noise: Include the noise variance.
+            n_features: Number of random Fourier features.
+            random: Random number generator to draw the samples with.
+
+        Returns:
+            Normalized samples. `shape = (n_points, size)`
+        """
+        if not isinstance(self._kernel, RBF):
+            raise ValueError("Pathwise sampling requires an RBF kernel.")
+
+        # random Fourier features of the RBF kernel on its active dimensions
+        active_dims = self._kernel.active_dims
+        lengthscale = np.broadcast_to(
+            self._kernel.lengthscale.values, (len(active_dims),)
+        )
+        variance = float(np.squeeze(self._kernel.variance.values))
+        frequencies = random.standard_normal((len(active_dims), n_features))
+        frequencies /= lengthscale[:, np.newaxis]
+        phases = random.uniform(0, 2 * np.pi, n_features)
+
+        def features(x: np.ndarray) -> np.ndarray:
+            return np.sqrt(2 * variance / n_features) * np.cos(
+                x[:, active_dims] @ frequencies + phases
+            )
+
+        # prior samples
+        weights = random.standard_normal((n_features, size))
+        sample = features(_X_test) @ weights
+
+        if self._X is None:
+            return sample
+
+        # update the prior samples with the residuals at the training data
+        _X, _y = self._gpy_model.X, self._gpy_model.Y
+        noise_std = np.sqrt(float(np.squeeze(self._noise_variance)))
+        residual = _y - features(_X) @ weights
+        residual -= noise_std * random.standard_normal(residual.shape)
+        chol = self._gpy_model.posterior.woodbury_chol
+        sample += self._kernel.K(_X_test, _X) @ scipy.linalg.cho_solve(
+            (chol, True), residual
+        )
+
+        if with_noise:
+            sample += noise_std * random.standard_normal(sample.shape)
+
         return sample
@@ -14,11 +14,15 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import copy
-from typing import Dict, Hashable, Tuple
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Hashable, Iterable, Tuple
 
 import numpy as np
+import scipy
 
 from transfergpbo.models import InputData, TaskData, Model, GPBO
+from transfergpbo.models.utils import compute_cholesky
 
 
 class RGPE(Model):
@@ -34,6 +38,7 @@ class RGPE(Model):
         n_samples: int = 256,
         n_sample_retries: int = 16,
         start: str = "random-random",
+        num_workers: int = 1,
         **gpygp_kwargs: dict,
     ):
         """Initialize the ranking-weighted Gaussian process ensemble.
@@ -42,8 +47,10 @@ class RGPE(Model):
             n_samples: Number of samples to calculate loss and model weights from. Must
                 be larger than `0`.
             n_sample_retries: Number of retries before failing the sampling process
-                during loss calculation (required for weight calculation). This prevents
-                numerical instabilities from failing a fit call.
+                during the loss calculation of a base model (required for weight
+                calculation). This prevents numerical instabilities from failing a fit
+                call. The target model loss is computed in closed form with jitter
+                added to singular matrices and needs no retries.
             start: Defines the initialization of the model before two unique target
                 observations are available, since the `RGPE` only works under that
                 condition. Must be one of "random-random", "random-mean",
@@ -55,6 +62,12 @@ class RGPE(Model):
                 target observation exists) is used. For "weighted", the base models
                 are weighted based on the probability of producing the closest guess
                 of the observed value.
+            num_workers: Number of threads computing the losses of the base models
+                concurrently. Defaults to `1`, i.e. the losses are computed one after
+                the other. `None` uses one thread per base model, up to the number of
+                CPUs. GP prediction and Cholesky decompositions run multi-threaded BLAS
+                in every thread, limit the BLAS threads (e.g. `OMP_NUM_THREADS=1`)
+                when `num_workers > 1` to avoid oversubscribing the cores.
             **gpygp_kwargs: Named arguments for initializing `GPBO` models.
         """
 
@@ -78,6 +91,7 @@ class RGPE(Model):
         self._n_samples = n_samples
         self._n_sample_retries = n_sample_retries
         self._start = start
+        self._num_workers = num_workers
         self._gpygp_kwargs = gpygp_kwargs
 
         self._metadata = {}
@@ -234,10 +248,22 @@ class RGPE(Model):
         # compute loss of the target model
         target_loss = self._target_loss()
 
-        # compute loss of all base models and
+        # compute loss of all base models concurrently, every base model has its
+        # own GP and its own random number generator, seeded from the global state
+        # so that the weights are reproducible
+        seeds = np.random.randint(np.iinfo(np.int32).max, size=len(self._source_gps))
         base_losses = np.empty((len(self._source_gps), self._n_samples))
-        for i, task_uid in enumerate(self._source_gps):
-            base_losses[i] = self._base_loss(task_uid)
+        num_workers = self._num_workers
+        if num_workers is None:
+            num_workers = min(len(self._source_gps), os.cpu_count())
+        if num_workers <= 1:
+            for i, loss in enumerate(map(self._base_loss, self._source_gps, seeds)):
+                base_losses[i] = loss
+        else:
+            with ThreadPoolExecutor(max_workers=num_workers) as pool:
+                losses = pool.map(self._base_loss, self._source_gps, seeds)
+                for i, loss in enumerate(losses):
+                    base_losses[i] = loss
 
         # discard base models with a mean loss higher than the 95th percentile
         # of the target model loss by setting their loss to an impossible high
@@ -339,7 +365,7 @@ class RGPE(Model):
             f"Weight calculation with one observation, second = {second}"
         )
 
-    def _base_loss(self, task_uid: int) -> np.ndarray:
+    def _base_loss(self, task_uid: int, seed: int = None) -> np.ndarray:
         """Calculate the loss of the base model for the given task.
 
         Draws `n_samples` samples from the base model at the observed `X` of the
@@ -350,6 +376,8 @@ class RGPE(Model):
 
         Args:
             task_uid: UID of the task.
+            seed: Seed of the random number generator the samples are drawn with.
+                Defaults to the global `np.random` state.
 
         Returns:
             Number of misrankings per sample. `shape = (n_samples, )`
@@ -363,20 +391,25 @@ class RGPE(Model):
         y = self._y[indices]
 
         # draw n_samples samples from the trained model
-        # compare every value to every other value for each sample
         # retry up to a limit to prevent numerical instabilities from failing
         # the loss calculation
+        rng = None if seed is None else np.random.default_rng(seed)
         for _ in range(self._n_sample_retries):
             try:
                 samples = model.sample(
-                    InputData(X), size=self._n_samples, with_noise=True
+                    InputData(X), size=self._n_samples, with_noise=True, rng=rng
                 )
                 break
             except (ValueError, np.linalg.LinAlgError) as exception:
                 last_exception = exception
         else:
             raise last_exception
-        sample_comps = samples[:, np.newaxis, :] < samples
+
+        # compare every value to every other value for each sample, one row of
+        # comparisons at a time
+        sample_comps = (
+            samples[i : i + 1, np.newaxis, :] < samples for i in range(samples.shape[0])
+        )
 
         # calculate loss with sample comparisons
         return self._compute_loss(sample_comps, y)
@@ -393,44 +426,93 @@ class RGPE(Model):
             Number of misrankings per sample. `shape = (n_samples, )`
         """
 
-        # get a copy of the trained model for the target task, since its
-        # training data is altered during loss calculation
-        model = copy.deepcopy(self._target_model)
-
         # get points observed on the target task with duplicates removed
         all_X, indices = np.unique(self._X, axis=0, return_index=True)
         all_y = self._y[indices]
 
-        # collect sample comparisons for each leave-one-out model
-        n_points = all_X.shape[0]
-        sample_comps = np.empty((n_points, n_points, self._n_samples), dtype=bool)
-        for i in range(n_points):
-            # leave i-th element out
-            # train model without optimization
-            X = np.delete(all_X, i, axis=0)
-            y = np.delete(all_y, i, axis=0)
-            model.fit(TaskData(X, y), optimize=False)
-
-            # draw n_samples samples from the trained model
+        def loo_sample_comps():
+            # draw n_samples samples from the i-th leave-one-out model
             # compare the i-th value to every other value for each sample
-            # retry up to a limit to prevent numerical instabilities from failing
-            # the loss calculation
-            for _ in range(self._n_sample_retries):
-                try:
-                    samples = model.sample(
-                        InputData(all_X), size=self._n_samples, with_noise=True
-                    )
-                    break
-                except (ValueError, np.linalg.LinAlgError) as exception:
-                    last_exception = exception
-            else:
-                raise last_exception
-            sample_comps[i] = samples[i, :] < samples
+            for i, (mean, factor) in enumerate(self._loo_posteriors(all_X, all_y)):
+                normal = np.random.standard_normal((factor.shape[1], self._n_samples))
+                samples = mean[:, np.newaxis] + factor @ normal
+                yield (samples[i] < samples)[np.newaxis]
+
+        sample_comps = loo_sample_comps()
 
         # calculate loss with sample comparisons
         return self._compute_loss(sample_comps, all_y)
 
-    def _compute_loss(self, sample_comps: np.ndarray, y: np.ndarray) -> np.ndarray:
+    def _loo_posteriors(
+        self, X: np.ndarray, y: np.ndarray
+    ) -> Iterable[Tuple[np.ndarray, np.ndarray]]:
+        """Calculate the leave-one-out posteriors of the target model.
+
+        The i-th leave-one-out model is the target model trained without the i-th
+        point, keeping the hyperparameters of the trained target model. Its noisy
+        posterior at all points `X` has the mean `mean` and the covariance
+        `factor factor^T`. The rankings are invariant to the denormalization, hence
+        everything is in the normalized space of the leave-one-out model.
+
+        Without normalization, a single Cholesky decomposition gives all posteriors in
+        closed form. With normalization, the normalizers are refit on each subset as
+        in `GPBO.fit`, which changes the kernel matrix, hence every posterior needs
+        its own decomposition.
+
+        Args:
+            X: Observed points of the target task without duplicates.
+                `shape = (n_points, n_features)`
+            y: Observed values of the target task at `X`. `shape = (n_points, 1)`
+
+        Returns:
+            Generator of the `(mean, factor)` of each leave-one-out posterior.
+            `mean.shape = (n_points, )`, `factor.shape[0] = n_points`
+        """
+        model = self._target_model
+        n_points = X.shape[0]
+        noise_variance = float(np.squeeze(model.noise_variance))
+
+        if model.x_normalizer is None:
+            # leaving out the i-th point shifts the mean by the i-th column of `U` and
+            # adds a rank-one term to the covariance of the full model with noise:
+            # mean_i = K alpha - U[:, i] alpha_i / K_inv_ii
+            # cov_i = cov + U[:, i] U[:, i]^T / K_inv_ii
+            K = model.kernel.K(X)
+            chol = compute_cholesky(K + noise_variance * np.eye(n_points))
+            K_inv = scipy.linalg.cho_solve((chol, True), np.eye(n_points))
+            alpha = K_inv @ y
+            U = K @ K_inv
+            K_inv_diag = np.diag(K_inv)
+
+            loo_means = (K @ alpha).T - U.T * (alpha / K_inv_diag[:, np.newaxis])
+            cov = K - U @ K + noise_variance * np.eye(n_points)
+            chol_cov = compute_cholesky((cov + cov.T) / 2)
+            loo_scales = U.T / np.sqrt(K_inv_diag)[:, np.newaxis]
+
+            for i in range(n_points):
+                yield loo_means[i], np.hstack([chol_cov, loo_scales[i, :, np.newaxis]])
+            return
+
+        for i in range(n_points):
+            subset = np.arange(n_points) != i
+            x_normalizer = copy.deepcopy(model.x_normalizer).fit(X[subset])
+            y_normalizer = copy.deepcopy(model.y_normalizer).fit(y[subset])
+            K = model.kernel.K(x_normalizer.transform(X))
+            K_subset = K[subset][:, subset] + noise_variance * np.eye(n_points - 1)
+
+            chol = compute_cholesky(K_subset)
+            alpha = scipy.linalg.cho_solve(
+                (chol, True), y_normalizer.transform(y[subset])
+            )
+            V = scipy.linalg.solve_triangular(chol, K[subset], lower=True)
+            mean = (K[:, subset] @ alpha).flatten()
+            cov = K - V.T @ V + noise_variance * np.eye(n_points)
+
+            yield mean, compute_cholesky((cov + cov.T) / 2)
+
+    def _compute_loss(
+        self, sample_comps: Iterable[np.ndarray], y: np.ndarray
+    ) -> np.ndarray:
         """Calculate the loss of the given sample comparisons.
 
         The sample comparisons are assumed to be generated by drawing `n_samples`
@@ -442,7 +524,9 @@ class RGPE(Model):
 
         Args:
             sample_comps: Relative rankings of values of n_samples samples drawn from a
-                model. `shape = (n_points, n_points, n_samples)`
+                model, given as consecutive blocks of rows such that the full
+                `(n_points, n_points, n_samples)` array is never stored. Each block
+                has `shape = (n_rows, n_points, n_samples)`.
             y: Observed values of the target task at the points at which samples
                 were drawn. `shape = (n_points, )`
 
@@ -451,9 +535,16 @@ class RGPE(Model):
         """
 
         # compare every target observation to every other target observation
-        # repeat the comparison for every sample for XORing
-        target_comps = np.tile(y[:, np.newaxis, :] < y, self._n_samples)
-
-        # XOR sample and target comparisons
-        # calculate loss per sample (count of different comparison results)
-        return np.sum(sample_comps ^ target_comps, axis=(1, 0))
+        # the comparison is broadcast over the samples for XORing
+        target_comps = y[:, np.newaxis, :] < y
+
+        # XOR sample and target comparisons block by block
+        # accumulate loss per sample (count of different comparison results)
+        loss = np.zeros(self._n_samples, dtype=int)
+        start = 0
+        for comps in sample_comps:
+            stop = start + comps.shape[0]
+            loss += np.sum(comps ^ target_comps[start:stop], axis=(1, 0))
+            start = stop
+
+        return loss
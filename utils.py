@@ -1,7 +1,10 @@
 #!/usr/bin/env python3 
 import numpy as np
 import matplotlib.pyplot as plt
+from scipy.stats import qmc
+from scipy.spatial import cKDTree
 from smt.sampling_methods import LHS
+from points_io import append_point, read_points
 
 
 def find_max_min_of_each_component(lst, max=True):
@@ -41,41 +44,25 @@ def check_inBounds(pnt, l_bounds, u_bounds):
     return in_zone
 
 def write_exp_result(file, response, exp_point):
-    "write experiemnt results to file"
-    with open(file, 'a', encoding="utf-8") as fout:
-        exp_line = str(response) + '\t' + '\t'.join([str(ele) for ele in exp_point]) + '\n'
-        fout.writelines(exp_line)
+    "write experiemnt results to file (TSV, or binary if file ends with points_io.BINARY_SUFFIX)"
+    append_point(file, response, exp_point)
     
     return 0
 
 def get_best_point(file, response_col=0):
-    "get the points with largest response"
-    results = []
-    with open(file, 'r', encoding="utf-8") as fin:
-        for line in fin:
-            if '#' not in line:
-                line_split = line.split()
-                point = line_split[:response_col] + line_split[(response_col+1):]
-                results.append([(float(line_split[response_col]), point)])
+    "get the points with largest response, ties are broken by comparing coordinates as strings"
+    responses, points = read_points(file, response_col)
 
-    best = max(results)[0]
-    best_response = float(best[0])
-    best_point = [float(ele) for ele in best[1]]
+    best_index = np.flatnonzero(responses == np.max(responses))
+    best_point = max([points[i].tolist() for i in best_index], key=lambda pnt: [str(ele) for ele in pnt])
 
     return best_point
 
 def get_all_points(file, response_col=0):
     "get all the points"
-    all_points = []
-    with open(file, 'r', encoding="utf-8") as fin:
-        for line in fin:
-            if '#' not in line:
-                line_split = line.split()
-                point_str = line_split[:response_col] + line_split[(response_col+1):]
-                point_float = [float(component) for component in point_str]
-                all_points.append(point_float)
+    _, points = read_points(file, response_col)
             
-    return all_points
+    return points.tolist()
 
 def dist(pnt_a, pnt_b, l_n=2):
     "return l_n distance between pnt_a and pnt_b"
@@ -84,6 +71,43 @@ def dist(pnt_a, pnt_b, l_n=2):
 
     return dist
 
+def square_dist_mat(pnts_a, pnts_b):
+    "return matrix (||a_i - b_j||^2) between rows of pnts_a (n*d) and rows of pnts_b (m*d)"
+    arr_a = np.asarray(pnts_a, dtype=float)
+    arr_b = np.asarray(pnts_b, dtype=float)
+    assert(arr_a.shape[1] == arr_b.shape[1])
+
+    # accumulate over components in the same order as sum([...]) of a single pair
+    norm2_mat = 0
+    for i in range(arr_a.shape[1]):
+        norm2_mat = norm2_mat + (arr_a[:, i][:, None] - arr_b[:, i][None, :])**2
+
+    return norm2_mat
+
+def sample_quasi_random(num_points, l_bounds, u_bounds, method="sobol"):
+    """
+    sample num_points (num_points*d) quasi-randomly in zone with boundary (l_bounds, u_bounds)
+    method: "sobol" (Sobol sequence shifted by np.random) | "lhs" (maximin LHD)
+    """
+    l_bounds = np.array(l_bounds, dtype=float)
+    u_bounds = np.array(u_bounds, dtype=float)
+    assert(l_bounds.shape == u_bounds.shape)
+    dim = len(l_bounds)
+
+    if method == "sobol":
+        # random shift modulo 1 keeps the low discrepancy and follows np.random.seed
+        sobol = qmc.Sobol(d=dim, scramble=False)
+        unit_points = sobol.random_base2(m=int(np.ceil(np.log2(max(num_points, 2)))))[:num_points]
+        unit_points = np.mod(unit_points + np.random.uniform(0, 1, size=dim), 1)
+        points = l_bounds + unit_points * (u_bounds - l_bounds)
+    elif method == "lhs":
+        sampling = LHS(xlimits=np.stack([l_bounds, u_bounds], axis=1), criterion='maximin')
+        points = sampling(num_points)
+    else:
+        raise(TypeError)
+
+    return points
+
 def draw_2d_lhd(file_sampling):
     "draw 2D LHD plot from sampling file"
     lst_v = []
@@ -126,14 +150,16 @@ def exp_mu(input, mu, theta=1):
 
     return exp_mu
 
+def gram_mat(lst_mu, theta=1):
+    "Gram matrix (exp_mu(mu_a, mu_b, theta)) of the centers lst_mu (n*d)"
+    return np.exp(-0.5 * square_dist_mat(lst_mu, lst_mu) / theta**2)
+
 def rkhs_norm(lst_coeff, lst_mu, theta=1):
     """
-    compute the RKHS norm  
+    compute the RKHS norm of sum_a coeff_a * exp_mu(, mu_a): sqrt(c^T K c) with Gram matrix K of lst_mu
     """
-    cross_part = 0
-    for ind_a, coeff_a in enumerate(lst_coeff):
-        for ind_b, coeff_b in enumerate(lst_coeff):
-            cross_part += coeff_a * coeff_b * exp_mu(lst_mu[ind_a], lst_mu[ind_b], theta=theta)
+    coeff = np.asarray(lst_coeff, dtype=float)
+    cross_part = coeff @ gram_mat(lst_mu, theta) @ coeff
     
     norm = np.sqrt(cross_part)
 
@@ -163,43 +189,38 @@ def read_points_from_file(file_path):
     return points  
 
 def find_max_points(file_path, r):  
+    """
+    greedy maxima separated by radius r: the best point, then repeatedly the best point farther than r from all found points
+    same result as scanning all points per found point, by one sweep in descending response with a KD-tree for the radius
+    """
     points = read_points_from_file(file_path)  
     
-    # 将 (函数值, 点坐标) 分离，方便处理  
+    # separate (response value, coordinates)
     values, coordinates = zip(*points)  
+    values = np.array(values, dtype=float)
     coordinates = np.array(coordinates)  
+
+    # the max value point first, then descending response with equal responses in file order (strict > of the scan)
+    order = [int(np.argmax(values))] + np.argsort(-values, kind="stable").tolist()
+    tree = cKDTree(coordinates)
+    r_query = r + 1e-9 * (1 + abs(r))   # candidates of the tree, exact norm check below
     
     found_points = []  
-    
-    # 找到最大值点  
-    max_value_index = np.argmax(values)  
-    max_point = coordinates[max_value_index]  
-    found_points.append(max_point)  
-    
-    while True:  
-        max_value = float('-inf')  
-        new_point = None  
-        
-        for i, point in enumerate(coordinates):  
-            
-            # 检查点是否在已找到点的半径范围外  
-            is_outside = True  
-            for found_point in found_points:  
-                if np.linalg.norm(point - found_point) <= r:  
-                    is_outside = False  
-                    break  
-            
-            if is_outside:  
-                value = values[i]  
-                if value > max_value:  
-                    max_value = value  
-                    new_point = point  
-        
-        if new_point is None:  
-            # 没有找到新点，结束循环  
-            break   
-        
-        found_points.append(new_point)  
+    is_excluded = np.zeros(len(values), dtype=bool)
+
+    for i in order:
+        if is_excluded[i]:
+            continue
+        if (len(found_points) > 0) and not (values[i] > float('-inf')):
+            break   # the scan never picks -inf or nan after the first point
+
+        found_point = coordinates[i]
+        found_points.append(found_point)
+
+        # exclude points within radius r of the new found point, same norm as the scan
+        for j in tree.query_ball_point(found_point, r_query):
+            if (not is_excluded[j]) and (np.linalg.norm(coordinates[j] - found_point) <= r):
+                is_excluded[j] = True
     
     return found_points  
 